@@ -0,0 +1,55 @@
+-- Admin pages: course/teacher search as RPCs
+-- manage_courses_page and manage_teachers_page filter by exact values picked from
+-- dropdowns. These functions do the filtering (NULL = no filter) and projection
+-- in Postgres, so only the columns the admin tables render come back.
+-- Called as POST /rest/v1/rpc/search_courses and /rest/v1/rpc/search_teachers.
+
+CREATE OR REPLACE FUNCTION search_courses(
+    p_code TEXT DEFAULT NULL,
+    p_teacher TEXT DEFAULT NULL,
+    p_semester INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    course_code TEXT,
+    course_name TEXT,
+    assisting_teacher TEXT,
+    credits INTEGER,
+    semester INTEGER,
+    department TEXT
+) AS $$
+    SELECT c."course_code", c."course_name", c."assisting_teacher", c."credits", c."semester", c."department"
+    FROM "courses" c
+    WHERE (p_code IS NULL OR c."course_code" = p_code)
+      AND (p_teacher IS NULL OR c."assisting_teacher" = p_teacher)
+      AND (p_semester IS NULL OR c."semester" = p_semester)
+    ORDER BY c."semester", c."course_name";
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION search_teachers(p_username TEXT DEFAULT NULL)
+RETURNS TABLE (
+    teacher_id BIGINT,
+    username TEXT,
+    teacher_name TEXT,
+    department TEXT,
+    teacher_email TEXT,
+    teacher_phone TEXT,
+    is_hod BOOLEAN,
+    hod_department TEXT
+) AS $$
+    SELECT t."teacher_id", t."username", t."teacher_name", t."department",
+           t."teacher_email", t."teacher_phone", t."is_hod", t."hod_department"
+    FROM "teachers" t
+    WHERE (p_username IS NULL OR t."username" = p_username)
+    ORDER BY t."teacher_name";
+$$ LANGUAGE sql STABLE;
+-- SECURITY INVOKER (the default): existing RLS on courses/teachers still applies.
+
+GRANT EXECUTE ON FUNCTION search_courses(TEXT, TEXT, INTEGER) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION search_teachers(TEXT) TO anon, authenticated;
+
+-- The filters are equality matches (course_code and username are already
+-- PRIMARY KEY / UNIQUE), so plain B-tree indexes cover the rest; pg_trgm
+-- would only help substring (ILIKE '%..%') searches, which these pages don't do.
+-- The assisting_teacher filter is served by idx_courses_teacher_sem_name (teacher_courses_index.sql).
+CREATE INDEX IF NOT EXISTS idx_courses_semester_name ON "courses"("semester", "course_name");
+CREATE INDEX IF NOT EXISTS idx_teachers_teacher_name ON "teachers"("teacher_name");
@@ -1,47 +1,184 @@
 # stellarminprod/app.py
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import re
+import logging
+import hmac
+import hashlib
 import datetime # Import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from zoneinfo import ZoneInfo
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, g, make_response
+from werkzeug.security import check_password_hash
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from functools import wraps
+from cachetools import TTLCache, cached
+try:
+    from gevent import monkey as gevent_monkey, get_hub as gevent_get_hub
+except ImportError: # gevent is only needed for the production server
+    gevent_monkey = None
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from markupsafe import Markup
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 
 # Import configuration variables
 from config import (
-    SUPABASE_URL, SUPABASE_HEADERS, STUDENT_TABLES, ALL_STUDENT_TABLES,
+    SUPABASE_URL, SUPABASE_HEADERS, SUPABASE_HEADERS_MIN, SUPABASE_HEADERS_UPSERT, SUPABASE_DELETE_HEADERS, STUDENT_TABLES, ALL_STUDENT_TABLES,
     TEACHER_TABLE, ADMIN_TABLE,
     MARKS_TABLES, SECRET_KEY, GRADES_TABLE, EVENTS_TABLE, HOLIDAYS_TABLE,
     ATTENDANCE_TABLES, SUPABASE_ANON_KEY, COURSE_TABLE, TIMETABLE_TABLE,
     NOTIFICATIONS_TABLE, NOTIFICATION_READS_TABLE,
     ALUMNI_TABLE, PROMOTION_LOG_TABLE, YEAR_BACK_TABLE, BACKLOG_TABLE,
     HOSTELS_TABLE, WARDENS_TABLE, HOSTEL_ASSIGNMENTS_TABLE, HOSTEL_COMPLAINTS_TABLE,
-    GATE_PASSES_TABLE
+    GATE_PASSES_TABLE, DASHBOARD_UPCOMING_TABLE, EVEN_MARKS_TABLES, RESULT_ANNOUNCEMENTS_TABLE, ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM,
+    FLASK_DEBUG, PORT, SUPABASE_POOL_WORKERS, SUPABASE_HTTP_POOL_SIZE, PWD_POOL_WORKERS, LOGIN_LOOKUP_TIMEOUT,
+    LOGIN_RATE_LIMIT, API_LOGIN_RATE_LIMIT, RATELIMIT_STORAGE_URI, ADMIN_PAGE_SIZE, AUTH_CACHE_TTL, AUTH_CACHE_SIZE, LOG_LEVEL
 )
 
 # Initialize Flask App
 app = Flask(__name__)
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    jsonify() and request.json through orjson: one C-level encode straight to bytes.
+    Types orjson can't serialize natively fall back to Flask's default (Decimal, __html__, ...).
+    """
+    option = orjson.OPT_NON_STR_KEYS # int dict keys, as the stdlib encoder allows
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s) # orjson.JSONDecodeError is a ValueError, so Flask still answers 400
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=self.option), mimetype=self.mimetype)
+
+
+app.json = OrjsonProvider(app)
 CORS(app)
 app.config['SECRET_KEY'] = SECRET_KEY
 
+# Per-IP rate limits (only applied where decorated, e.g. login attempts).
+# headers_enabled adds X-RateLimit-* and Retry-After so clients know when to retry.
+limiter = Limiter(get_remote_address, app=app, storage_uri=RATELIMIT_STORAGE_URI, headers_enabled=True)
+
+# argon2id hasher for all new password hashes (verification releases the GIL)
+PH = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM
+)
+
+# Shared HTTP session for all Supabase REST calls: keep-alive connection pooling,
+# default Supabase headers, and retries for transient errors. Retries back off exponentially
+# with jitter and honour Retry-After; after the last one the real response is returned.
+# Only idempotent methods are retried (GET/DELETE/...), plus POSTs to the read-only RPCs below.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    backoff_jitter=0.1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+SESSION = requests.Session()
+SESSION.headers.update(SUPABASE_HEADERS)
+_adapter = HTTPAdapter(pool_connections=20, pool_maxsize=SUPABASE_HTTP_POOL_SIZE, max_retries=_RETRY)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+# Every allowed RPC is a STABLE (read-only) function, so its POSTs are safe to retry too.
+# (requests uses the longest matching mount prefix, so only RPC URLs get this adapter.)
+_rpc_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=SUPABASE_HTTP_POOL_SIZE,
+    max_retries=_RETRY.new(allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"})
+)
+SESSION.mount(f"{SUPABASE_URL}/rest/v1/rpc/", _rpc_adapter)
+
+# Shared pool for issuing independent Supabase lookups concurrently (I/O bound)
+SUPABASE_POOL = ThreadPoolExecutor(max_workers=SUPABASE_POOL_WORKERS, thread_name_prefix='supabase')
+# Separate, small pool for password verification (CPU bound; argon2/bcrypt release the GIL)
+PWD_POOL = ThreadPoolExecutor(max_workers=PWD_POOL_WORKERS, thread_name_prefix='pwd')
+
 # --- Helper Functions ---
 
+# Basic validation to prevent unintended table access (built once at import)
+_ALLOWED_TABLES = frozenset((
+    *ALL_STUDENT_TABLES, *MARKS_TABLES, *EVEN_MARKS_TABLES, *ATTENDANCE_TABLES,
+    TEACHER_TABLE, ADMIN_TABLE, GRADES_TABLE, EVENTS_TABLE, HOLIDAYS_TABLE,
+    COURSE_TABLE, TIMETABLE_TABLE, NOTIFICATIONS_TABLE, NOTIFICATION_READS_TABLE,
+    PROMOTION_LOG_TABLE, YEAR_BACK_TABLE, BACKLOG_TABLE, RESULT_ANNOUNCEMENTS_TABLE,
+    HOSTELS_TABLE, WARDENS_TABLE, HOSTEL_ASSIGNMENTS_TABLE, HOSTEL_COMPLAINTS_TABLE,
+    GATE_PASSES_TABLE, DASHBOARD_UPCOMING_TABLE,
+)) # Add other valid tables
+
+# Every allowed table's REST URL, built once at import
+TABLE_URLS = {t: f"{SUPABASE_URL}/rest/v1/{t}" for t in _ALLOWED_TABLES}
+
 def get_supabase_rest_url(table_name):
-    """Constructs the Supabase REST API URL for a table."""
-    # Basic validation to prevent unintended table access
-    allowed_tables = ALL_STUDENT_TABLES + MARKS_TABLES + ATTENDANCE_TABLES + [
-        TEACHER_TABLE, ADMIN_TABLE, GRADES_TABLE, EVENTS_TABLE, HOLIDAYS_TABLE,
-        COURSE_TABLE, TIMETABLE_TABLE, NOTIFICATIONS_TABLE, NOTIFICATION_READS_TABLE,
-        PROMOTION_LOG_TABLE, YEAR_BACK_TABLE, BACKLOG_TABLE,
-        HOSTELS_TABLE, WARDENS_TABLE, HOSTEL_ASSIGNMENTS_TABLE, HOSTEL_COMPLAINTS_TABLE,
-        GATE_PASSES_TABLE
-    ] # Add other valid tables
-    if table_name not in allowed_tables:
-         raise ValueError(f"Access to table '{table_name}' is not permitted.")
-    return f"{SUPABASE_URL}/rest/v1/{table_name}"
+    """Returns the Supabase REST API URL for a table."""
+    try:
+        return TABLE_URLS[table_name]
+    except KeyError:
+        raise ValueError(f"Access to table '{table_name}' is not permitted.") from None
+
+def to_json(obj):
+    """JSON text for embedding in templates (orjson: faster than json.dumps, compact output)."""
+    return orjson.dumps(obj).decode()
+
+# Constant lists the marks/attendance pages hand to their JS, serialized once and exposed
+# to every template as globals (Markup: already-safe JSON, no escaping per render)
+ATTENDANCE_TABLES_JSON = Markup(to_json(ATTENDANCE_TABLES))
+MARKS_TABLES_JSON = Markup(to_json(MARKS_TABLES))
+app.jinja_env.globals.update(attendance_tables_json=ATTENDANCE_TABLES_JSON, marks_tables_json=MARKS_TABLES_JSON)
+
+# Values every template may read that never change per request: registered once
+# instead of passed to each render_template / rebuilt by the context processor
+app.jinja_env.globals.update(
+    supabase_url=SUPABASE_URL,
+    supabase_key=SUPABASE_ANON_KEY,
+    STUDENT_TABLES=STUDENT_TABLES,
+    ALL_STUDENT_TABLES=ALL_STUDENT_TABLES,
+)
+
+# Resolved once at import for the tables the admin/course/timetable routes hit on every request
+COURSE_URL = get_supabase_rest_url(COURSE_TABLE)
+TEACHER_URL = get_supabase_rest_url(TEACHER_TABLE)
+TIMETABLE_URL = get_supabase_rest_url(TIMETABLE_TABLE)
+
+# Postgres functions the app calls through PostgREST (see the matching *.sql files)
+_ALLOWED_RPCS = frozenset(("login_lookup", "search_courses", "search_teachers", "timetable_grouped"))
+
+_RPC_URLS = {f: f"{SUPABASE_URL}/rest/v1/rpc/{f}" for f in _ALLOWED_RPCS}
+
+def get_supabase_rpc_url(function_name):
+    """Returns the Supabase REST API URL for a Postgres function (RPC)."""
+    try:
+        return _RPC_URLS[function_name]
+    except KeyError:
+        raise ValueError(f"Call to function '{function_name}' is not permitted.") from None
+
+# Static lookups for the batch helpers below
+_BATCH_BY_PREFIX = {'b24': 'b1', 'b23': 'b2', 'b22': 'b3', 'b21': 'b4'}
+_MARKS_BY_BATCH = {'b1': 'marks1', 'b2': 'marks2', 'b3': 'marks3', 'b4': 'marks4'}
+_ATT_BY_BATCH = {'b1': 'attendance1', 'b2': 'attendance2', 'b3': 'attendance3', 'b4': 'attendance4'}
+# Login roll_no search order per detected batch: that batch first, then the others (None: no prefix match)
+_STUDENT_SEARCH_ORDER = {t: (t, *(o for o in STUDENT_TABLES if o != t)) for t in STUDENT_TABLES}
+_STUDENT_SEARCH_ORDER[None] = tuple(STUDENT_TABLES)
 
 def determine_student_batch(roll_no):
     """
@@ -54,101 +191,94 @@ def determine_student_batch(roll_no):
     NOTE: If a student is not found in the expected table, the login code
     also searches all other batch tables as a fallback.
     """
-    if not roll_no or len(roll_no) < 3 or not roll_no.lower().startswith('b') or not roll_no[1:3].isdigit():
-        return None
-
-    roll_lower = roll_no.lower()
-    prefix = roll_lower[1:3]  # e.g. '24', '23', '22', '21'
-
-    if prefix == '24': return 'b1'
-    if prefix == '23': return 'b2'
-    if prefix == '22': return 'b3'
-    if prefix == '21': return 'b4'
-
-    print(f"Warning: Roll number prefix 'b{prefix}' does not map to a known batch table.")
-    return None
+    prefix = roll_no[:3].lower() if roll_no else ''
+    batch = _BATCH_BY_PREFIX.get(prefix)
+    if batch is None and len(prefix) == 3 and prefix[0] == 'b' and prefix[1:].isdigit():
+        logger.warning("Roll number prefix '%s' does not map to a known batch table.", prefix)
+    return batch
 
 def get_marks_table_for_student(roll_no):
     """Determines the correct marks table (marks1-marks4) for a student."""
-    batch = determine_student_batch(roll_no)
-    if batch == 'b1': return 'marks1'
-    if batch == 'b2': return 'marks2'
-    if batch == 'b3': return 'marks3'
-    if batch == 'b4': return 'marks4'
-    return None
+    return _MARKS_BY_BATCH.get(determine_student_batch(roll_no))
 
 def determine_attendance_table(batch_table):
     """Determines the correct attendance table (attendance1-4) from a student batch table (b1-4)."""
-    if batch_table == 'b1': return 'attendance1'
-    if batch_table == 'b2': return 'attendance2'
-    if batch_table == 'b3': return 'attendance3'
-    if batch_table == 'b4': return 'attendance4'
-    return None
+    return _ATT_BY_BATCH.get(batch_table)
 
-# --- START OF NEW HELPER FUNCTION ---
-def fetch_all_teachers():
-    """Fetches all teachers (username and name) from the database."""
-    try:
-        teacher_url = get_supabase_rest_url(TEACHER_TABLE)
-        # Select username and teacher_name, order by name
-        teacher_params = {'select': 'username,teacher_name', 'order': 'teacher_name.asc'}
-        response_teachers = requests.get(teacher_url, headers=SUPABASE_HEADERS, params=teacher_params, timeout=10)
-        response_teachers.raise_for_status()
-        return response_teachers.json() # Returns a list of teacher objects
-    except Exception as e:
-        print(f"Error fetching teachers: {e}")
-        flash("Could not load teacher list for dropdowns.", "warning")
-        return [] # Return empty list on error
-# --- END OF NEW HELPER FUNCTION ---
+def postgrest_quote(value):
+    """Double-quotes a value for use inside a PostgREST or=(...) filter, so commas and parentheses are literal."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def duplicate_key_column(response, columns):
+    """
+    Returns which of `columns` caused a PostgREST unique-violation (409) response.
+    Postgres reports it as details "Key (col)=(value) already exists." and the
+    constraint name (e.g. "b1_student_email_key") in message.
+    """
+    try:
+        error = response.json()
+    except ValueError:
+        return None
+    match = re.search(r'Key \((\w+)\)=', error.get('details') or '')
+    if match and match.group(1) in columns:
+        return match.group(1)
+    message = error.get('message') or ''
+    for column in columns:
+        if column in message:
+            return column
+    return None
 
 # --- START NEW HELPER ---
+# Logic: b25 -> Year 1 (b1), b24 -> Year 2 (b2), etc.
+_YEAR_MAP = {'b1': 1, 'b2': 2, 'b3': 3, 'b4': 4}
+
 def get_current_semester(student_batch, current_month):
     """Determines the student's current semester based on batch and month."""
-    
-    # Logic: b25 -> Year 1 (b1), b24 -> Year 2 (b2), etc.
-    year_map = {
-        'b1': 1,  # Corresponds to b25
-        'b2': 2,  # Corresponds to b24
-        'b3': 3,  # Corresponds to b23
-        'b4': 4   # Corresponds to b22
-    }
-    student_year = year_map.get(student_batch)
-    if not student_year:
+    student_year = _YEAR_MAP.get(student_batch)
+    if student_year is None:
         return None
-
-    # Assuming July-December is ODD semester, Jan-June is EVEN semester
+    # Assuming July-December is ODD semester (Year 1 -> Sem 1), Jan-June is EVEN (Year 1 -> Sem 2)
     # Adjust this logic if your academic calendar is different
-    if 7 <= current_month <= 12: # July to Dec -> Odd Sem
-        return student_year * 2 - 1 # Year 1 -> Sem 1, Year 2 -> Sem 3
-    else: # Jan to June -> Even Sem
-        return student_year * 2 # Year 1 -> Sem 2, Year 2 -> Sem 4
+    return student_year * 2 - (1 if current_month >= 7 else 0)
 # --- END NEW HELPER ---
 
 # --- Context Processor ---
 @app.context_processor
 def inject_now():
-    return {
-        'now': datetime.datetime.utcnow(),
-        'STUDENT_TABLES': STUDENT_TABLES,
-        'ALL_STUDENT_TABLES': ALL_STUDENT_TABLES
-    }
+    # g.now is read once per request (see stamp_request_time); fall back if the hook never ran
+    now = g.get('now') or datetime.datetime.now(datetime.timezone.utc)
+    return {'now': now}
+
+# --- Request-scoped User ---
+@app.before_request
+def stamp_request_time():
+    """One UTC clock read per request, shared by every template render."""
+    g.now = datetime.datetime.now(datetime.timezone.utc)
+
+@app.before_request
+def load_request_user():
+    """Reads the logged-in user from the session once per request (see g.user / g.role)."""
+    g.user = session.get('user')
+    g.role = g.user.get('role') if g.user else None
 
 # --- Authentication Decorators ---
 
 def login_required(role=None):
     """Decorator to require login. Can optionally check for specific roles."""
+    # Built once per decorated view, not on every request
+    required_roles = (role if isinstance(role, list) else [role]) if role else []
+    allowed_roles = frozenset(required_roles)
+    denied_message = f'Access denied. Required role: {", ".join(required_roles)}.'
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'user' not in session:
+            if g.user is None:
                 flash('Please log in to access this page.', 'warning')
                 return redirect(url_for('login_page'))
-            if role:
-                required_roles = role if isinstance(role, list) else [role]
-                user_role = session['user'].get('role')
-                if user_role not in required_roles:
-                    flash(f'Access denied. Required role: {", ".join(required_roles)}.', 'danger')
-                    return redirect(url_for('index')) # Redirect to main dashboard
+            if allowed_roles and g.role not in allowed_roles:
+                flash(denied_message, 'danger')
+                return redirect(url_for('index')) # Redirect to main dashboard
 
             return f(*args, **kwargs)
         return decorated_function
@@ -156,157 +286,299 @@ def login_required(role=None):
 
 # --- Authentication Logic (MODIFIED) ---
 
+def hash_password(password):
+    """Hashes a password with argon2id. Use this for every newly stored password."""
+    return PH.hash(password)
+
 def verify_password_hash(hash_str, password):
     if not hash_str:
         return False
+    if hash_str.startswith('$argon2'):
+        try:
+            return PH.verify(hash_str, password)
+        except VerificationError:
+            return False
+        except InvalidHashError as e:
+            logger.error("Argon2 hash error: %s", e)
+            return False
     if hash_str.startswith('$2a$') or hash_str.startswith('$2b$'):
         try:
             return bcrypt.checkpw(password.encode('utf-8'), hash_str.encode('utf-8'))
         except Exception as e:
-            print(f"Bcrypt hash error: {e}")
+            logger.error("Bcrypt hash error: %s", e)
             return False
     try:
         return check_password_hash(hash_str, password)
     except Exception as e:
-        print(f"Werkzeug hash error: {e}")
+        logger.error("Werkzeug hash error: %s", e)
         return False
 
-def fetch_and_verify_user(username, password):
-    """Finds user across tables and verifies password."""
-    # Assume username could be roll_no (student), username (teacher/admin), or email (parent/student)
-    username_lower = username.lower() 
+def _gevent_threads_patched():
+    """
+    True under gevent: threading is monkey-patched, so PWD_POOL workers would be greenlets
+    on the same OS thread and CPU-bound hashing would still block. Use gevent's native
+    OS-thread pool instead.
+    """
+    return gevent_monkey is not None and gevent_monkey.is_module_patched('threading')
 
-    # 1. Try Student Tables (by roll_no) — primary table first, then all others as fallback
-    batch_table = determine_student_batch(username_lower)
-    tables_to_search = [batch_table] if batch_table else []
-    # Add remaining batch tables as fallback (avoids duplicating primary table)
-    for t in STUDENT_TABLES:
-        if t not in tables_to_search:
-            tables_to_search.append(t)
+def verify_password_pooled(hash_str, password):
+    """
+    verify_password_hash() run off the request thread, so a 50-300 ms hash does not stall other requests.
+    Memoized on g for the rest of the request: the same (hash, password) pair is never verified twice.
+    """
+    if not hash_str:
+        return False
+    verified = g.setdefault('verified_passwords', {})
+    key = (hash_str, hashlib.sha256(password.encode('utf-8')).digest())
+    if key not in verified:
+        if _gevent_threads_patched():
+            verified[key] = gevent_get_hub().threadpool.apply(verify_password_hash, (hash_str, password))
+        else:
+            verified[key] = PWD_POOL.submit(verify_password_hash, hash_str, password).result()
+    return verified[key]
+
+def hash_passwords_pooled(*passwords):
+    """hash_password() for several independent passwords in parallel, off the request thread."""
+    if _gevent_threads_patched():
+        threadpool = gevent_get_hub().threadpool
+        pending = [threadpool.spawn(hash_password, p) for p in passwords]
+        return [result.get() for result in pending]
+    return list(PWD_POOL.map(hash_password, passwords))
+
+def password_needs_rehash(hash_str):
+    """True for legacy (bcrypt / PBKDF2) hashes or argon2 hashes with outdated parameters."""
+    if not hash_str or not hash_str.startswith('$argon2'):
+        return True
+    try:
+        return PH.check_needs_rehash(hash_str)
+    except InvalidHashError:
+        return True
 
-    for tbl in tables_to_search:
-        try:
-            url = get_supabase_rest_url(tbl)
-            params = {'select': '*,student_password', 'roll_no': f'eq.{username_lower}'}
-            response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            if data and len(data) >= 1:
-                user_data = data[0]
-                # Check password
-                if verify_password_hash(user_data.get('student_password', ''), password):
-                    user_data.pop('student_password', None)  # Remove hash from session data
-                    user_data.pop('parent_password', None)
-                    user_data['role'] = 'student'
-                    user_data['batch'] = tbl
-                    user_data['roll_no'] = user_data.get('roll_no', username_lower)
-                    return user_data
-                else:
-                    # Found the user but wrong password — stop searching other batch tables
-                    if data:
-                        print(f"Student {username_lower} found in {tbl} but password mismatch.")
-                        break
-        except Exception as e:
-            print(f"Error querying {tbl} by roll_no: {e}")
+def _store_rehashed_password(table, match_column, match_value, password_column, password):
+    try:
+        url = get_supabase_rest_url(table)
+        params = {match_column: f'eq.{match_value}'}
+        response = SESSION.patch(url, headers=SUPABASE_HEADERS_MIN, params=params, json={password_column: hash_password(password)}, timeout=10)
+        response.raise_for_status()
+    except Exception as e:
+        logger.error("Error re-hashing password in %s: %s", table, e)
 
+def upgrade_password_hash(hash_str, table, match_column, match_value, password_column, password):
+    """
+    Re-hashes a successfully verified legacy password with argon2id.
+    Runs in the background so the login response is not delayed by the extra write.
+    """
+    if not match_value or not password_needs_rehash(hash_str):
+        return
+    args = (table, match_column, match_value, password_column, password)
+    if _gevent_threads_patched():
+        gevent_get_hub().threadpool.spawn(_store_rehashed_password, *args)
+    else:
+        PWD_POOL.submit(_store_rehashed_password, *args)
 
-    # 2. Try Teacher Table (by username)
+def _lookup_rows(table, params, label, timeout=10):
+    """GETs matching rows from one table. Runs on SUPABASE_POOL; returns [] on failure."""
     try:
-        url = get_supabase_rest_url(TEACHER_TABLE)
-        params = {'select': '*,teacher_password', 'username': f'eq.{username_lower}'}
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        url = get_supabase_rest_url(table)
+        response = SESSION.get(url, params=params, timeout=timeout)
         response.raise_for_status()
-        data = response.json()
-        if data and len(data) == 1:
-            user_data = data[0]
-            if verify_password_hash(user_data.get('teacher_password', ''), password):
-                user_data.pop('teacher_password', None)
-                user_data['role'] = 'teacher'
-                user_data['username'] = user_data.get('username', username_lower) # Ensure username is set
-                
-                # --- NEW: Check if this teacher is also a warden ---
-                try:
-                    w_url = get_supabase_rest_url(WARDENS_TABLE)
-                    # Check by teacher_email (assuming it's in the teachers table)
-                    teacher_email = user_data.get('teacher_email')
-                    if teacher_email:
-                        w_params = {'teacher_email': f'eq.{teacher_email}'}
-                        w_resp = requests.get(w_url, headers=SUPABASE_HEADERS, params=w_params, timeout=5)
-                        if w_resp.ok and w_resp.json():
-                            warden_info = w_resp.json()[0]
-                            user_data['is_warden'] = True
-                            user_data['hostel_name'] = warden_info.get('hostel_name')
-                except Exception as e:
-                    print(f"Error checking warden status: {e}")
-                
-                return user_data
+        return response.json()
     except Exception as e:
-        print(f"Error querying {TEACHER_TABLE}: {e}")
+        logger.error("Error querying %s %s: %s", table, label, e)
+        return []
+
+def _get_rows(table, params, timeout=10):
+    """GETs rows from a table and raises on HTTP errors. Safe to run on SUPABASE_POOL (no flash)."""
+    response = SESSION.get(get_supabase_rest_url(table), params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+# ETag + body of the last full response for the cached list GETs (courses, teachers), keyed by
+# (url, params). A refill sends If-None-Match and reuses the stored body on 304 Not Modified.
+_ETAG_CACHE = TTLCache(maxsize=1024, ttl=3600)
+_ETAG_CACHE_LOCK = threading.Lock()
+
+def _get_list_conditional(url, params, timeout=10):
+    """GET with If-None-Match; returns the stored body on 304. Raises on HTTP errors. Not for edit forms."""
+    key = (url, tuple(sorted(params.items())))
+    with _ETAG_CACHE_LOCK:
+        stored = _ETAG_CACHE.get(key)
+    headers = {'If-None-Match': stored[0]} if stored else None
+    response = SESSION.get(url, params=params, headers=headers, timeout=timeout)
+    if response.status_code == 304 and stored:
+        return stored[1]
+    response.raise_for_status()
+    data = response.json()
+    etag = response.headers.get('ETag')
+    if etag:
+        with _ETAG_CACHE_LOCK:
+            _ETAG_CACHE[key] = (etag, data)
+    return data
+
+def _call_rpc(function_name, args, timeout=10, params=None):
+    """POSTs to a Postgres function (RPC) and returns its JSON; raises on HTTP errors. Safe on SUPABASE_POOL."""
+    response = SESSION.post(get_supabase_rpc_url(function_name), params=params, json=args, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+def _page_window(page, per_page=ADMIN_PAGE_SIZE):
+    """PostgREST limit/offset for a 1-based page. Fetches one extra row to tell if there is a next page (no COUNT)."""
+    return {'limit': per_page + 1, 'offset': (page - 1) * per_page}
+
+def _page_links(endpoint, page, has_next, search_args):
+    """Previous/next URLs for a paginated admin list, keeping the current search filters."""
+    prev_url = url_for(endpoint, **search_args, page=page - 1) if page > 1 else None
+    next_url = url_for(endpoint, **search_args, page=page + 1) if has_next else None
+    return prev_url, next_url
+
+# Admin search forms: (query arg, RPC parameter, converter). Filters are exact matches from
+# dropdowns; when several args feed one parameter, the first non-empty one wins.
+_COURSE_SEARCH_FIELDS = (
+    ('search_name', 'p_code', str), # Name dropdown value is also the course code
+    ('search_code', 'p_code', str),
+    ('search_teacher', 'p_teacher', str),
+    ('search_semester', 'p_semester', int),
+)
+_TEACHER_SEARCH_FIELDS = (
+    ('search_name', 'p_username', str), # Name dropdown uses username as value
+    ('search_username', 'p_username', str),
+)
 
-    # 3. Try Admin Table (by username)
+def _search_args(fields, args):
+    """RPC filter args from the query string; None (no filter) for empty or unparseable values."""
+    search_args = dict.fromkeys(param for _, param, _ in fields)
+    for arg, param, convert in fields:
+        value = args.get(arg, '').strip()
+        if value and search_args[param] is None:
+            try:
+                search_args[param] = convert(value)
+            except ValueError:
+                pass
+    return search_args
+
+def _login_lookup(username_lower, timeout=LOGIN_LOOKUP_TIMEOUT):
+    """
+    Every account row matching the username, in ONE request (login_lookup RPC, see
+    login_lookup.sql): b1-b4 by roll_no, student_email or parent_email, teachers and
+    admin by username. Each row carries 'batch_table' (teacher rows also 'warden_hostel').
+    Returns [] on failure.
+    """
     try:
-        url = get_supabase_rest_url(ADMIN_TABLE)
-        params = {'select': '*,password', 'username': f'eq.{username_lower}'}
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        url = get_supabase_rpc_url('login_lookup')
+        response = SESSION.post(url, json={'u': username_lower}, timeout=timeout)
         response.raise_for_status()
-        data = response.json()
-        if data and len(data) == 1:
-            user_data = data[0]
-            if verify_password_hash(user_data.get('password', ''), password):
-                user_data.pop('password', None)
-                user_data['role'] = 'admin'
-                return user_data
+        return response.json()
     except Exception as e:
-        print(f"Error querying {ADMIN_TABLE}: {e}")
+        logger.error("Error calling login_lookup: %s", e)
+        return []
+
+# Role tags merged into a verified account row, keyed by the table the row came from
+_ROLE_META = {
+    **{t: {'role': 'student', 'batch': t} for t in STUDENT_TABLES},
+    TEACHER_TABLE: {'role': 'teacher'},
+    ADMIN_TABLE: {'role': 'admin'},
+}
+# Password hashes and login_lookup bookkeeping, never stored in the session
+_LOGIN_ONLY_COLUMNS = frozenset(('student_password', 'parent_password', 'teacher_password', 'password', 'batch_table', 'warden_hostel'))
+
+def _session_user(row, table):
+    """A verified account row as session data: one copy without hashes, role (and batch) merged in."""
+    user = {k: v for k, v in row.items() if k not in _LOGIN_ONLY_COLUMNS}
+    user.update(_ROLE_META[table])
+    return user
+
+def fetch_and_verify_user(username, password):
+    """Finds user across tables and verifies password."""
+    # Assume username could be roll_no (student), username (teacher/admin), or email (parent/student)
+    username_lower = username.lower() 
+
+    # Reject input no account can match before issuing any Supabase requests
+    if len(username_lower) < 3 or len(username_lower) > 254 or any(c.isspace() for c in username_lower):
+        return None
+
+    # Student tables by roll_no — primary table first, then all others as fallback
+    tables_to_search = _STUDENT_SEARCH_ORDER[determine_student_batch(username_lower)]
+
+    # Every candidate account (students, parents, teachers, admins) comes back from ONE RPC;
+    # rows are still checked in the priority order below, so the first match wins as before.
+    matches = _login_lookup(username_lower)
+
+    def matched_rows(tbl, column):
+        """Rows from table `tbl` that matched the username on `column`."""
+        return [row for row in matches if row.get('batch_table') == tbl and row.get(column) == username_lower]
+
+    # 1. Try Student Tables (by roll_no)
+    for tbl in tables_to_search:
+        data = matched_rows(tbl, 'roll_no')
+        if data and len(data) >= 1:
+            user_data = data[0]
+            # Check password
+            stored_hash = user_data.get('student_password', '')
+            if verify_password_pooled(stored_hash, password):
+                upgrade_password_hash(stored_hash, tbl, 'roll_no', user_data.get('roll_no'), 'student_password', password)
+                return _session_user(user_data, tbl)
+            else:
+                # Found the user but wrong password — stop searching other batch tables
+                logger.info("Student %s found in %s but password mismatch.", username_lower, tbl)
+                break
+
+    # 2. Try Teacher Table (by username)
+    data = matched_rows(TEACHER_TABLE, 'username')
+    if data and len(data) == 1:
+        user_data = data[0]
+        stored_hash = user_data.get('teacher_password', '')
+        if verify_password_pooled(stored_hash, password):
+            upgrade_password_hash(stored_hash, TEACHER_TABLE, 'username', user_data.get('username'), 'teacher_password', password)
+            warden_hostel = user_data.get('warden_hostel')
+            user_data = _session_user(user_data, TEACHER_TABLE)
+            
+            # --- NEW: Check if this teacher is also a warden (joined by teacher_email in the RPC) ---
+            if warden_hostel:
+                user_data['is_warden'] = True
+                user_data['hostel_name'] = warden_hostel
+            
+            return user_data
+
+    # 3. Try Admin Table (by username)
+    data = matched_rows(ADMIN_TABLE, 'username')
+    if data and len(data) == 1:
+        user_data = data[0]
+        stored_hash = user_data.get('password', '')
+        if verify_password_pooled(stored_hash, password):
+            upgrade_password_hash(stored_hash, ADMIN_TABLE, 'username', user_data.get('username'), 'password', password)
+            return _session_user(user_data, ADMIN_TABLE)
 
     # 4. --- NEW: Try Parent Login (by parent_email) ---
     # This will check b1, b2, b3, b4 for a matching parent_email
     for batch_table in STUDENT_TABLES:
-        try:
-            url = get_supabase_rest_url(batch_table)
-            # Query by parent_email (which is what the parent enters as 'username')
-            params = {'select': '*,parent_password,roll_no,student_name', 'parent_email': f'eq.{username_lower}'}
-            response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data and len(data) == 1:
-                parent_data = data[0]
-                # Verify the parent_password
-                # THIS ASSUMES parent_password IS HASHED in the database
-                if verify_password_hash(parent_data.get('parent_password', ''), password):
-                    # Create a session object for the parent
-                    user_data = {
-                        'role': 'parent',
-                        'parent_email': parent_data['parent_email'],
-                        'student_roll_no': parent_data['roll_no'],
-                        'student_name': parent_data['student_name'],
-                        'batch': batch_table # Store which batch table the student is in
-                    }
-                    return user_data
-        except Exception as e:
-            print(f"Error querying {batch_table} for parent: {e}")
+        data = matched_rows(batch_table, 'parent_email')
+        if data and len(data) == 1:
+            parent_data = data[0]
+            # Verify the parent_password
+            # THIS ASSUMES parent_password IS HASHED in the database
+            stored_hash = parent_data.get('parent_password', '')
+            if verify_password_pooled(stored_hash, password):
+                upgrade_password_hash(stored_hash, batch_table, 'parent_email', parent_data.get('parent_email'), 'parent_password', password)
+                # Create a session object for the parent
+                user_data = {
+                    'role': 'parent',
+                    'parent_email': parent_data['parent_email'],
+                    'student_roll_no': parent_data['roll_no'],
+                    'student_name': parent_data['student_name'],
+                    'batch': batch_table # Store which batch table the student is in
+                }
+                return user_data
             
     # 5. --- NEW: Try Student Login by Email ---
     # This allows students to log in with email OR roll_no
     for batch_table in STUDENT_TABLES:
-        try:
-            url = get_supabase_rest_url(batch_table)
-            params = {'select': '*,student_password,roll_no', 'student_email': f'eq.{username_lower}'}
-            response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            if data and len(data) == 1:
-                user_data = data[0]
-                if verify_password_hash(user_data.get('student_password', ''), password):
-                    user_data.pop('student_password', None)
-                    user_data.pop('parent_password', None)
-                    user_data['role'] = 'student'
-                    user_data['batch'] = batch_table
-                    user_data['roll_no'] = user_data.get('roll_no')
-                    return user_data
-        except Exception as e:
-            print(f"Error querying {batch_table} by student_email: {e}")
+        data = matched_rows(batch_table, 'student_email')
+        if data and len(data) == 1:
+            user_data = data[0]
+            stored_hash = user_data.get('student_password', '')
+            if verify_password_pooled(stored_hash, password):
+                upgrade_password_hash(stored_hash, batch_table, 'student_email', user_data.get('student_email'), 'student_password', password)
+                return _session_user(user_data, batch_table)
 
 
     return None # No user found or password incorrect
@@ -316,15 +588,73 @@ def fetch_and_verify_user(username, password):
 # Hardcoded Timetable (as from your JS)
 # This should ideally be moved to the database
 
+_IST = ZoneInfo("Asia/Kolkata")
+_WEEKDAY = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN") # Indexed by date.weekday(); matches timetables.day_of_week
+
+# Events/holidays change a few times a day at most; keep them in memory (per worker)
+# for 5 minutes, keyed by date. Cleared by _invalidate_upcoming() on event/holiday writes.
+_UPCOMING_CACHE = TTLCache(maxsize=4, ttl=300)
+_UPCOMING_CACHE_LOCK = threading.Lock()
+
+def _invalidate_upcoming():
+    with _UPCOMING_CACHE_LOCK:
+        _UPCOMING_CACHE.clear()
+
+# Dashboard fetches. These run on SUPABASE_POOL, so they raise instead of flashing.
+@cached(cache=_UPCOMING_CACHE, lock=_UPCOMING_CACHE_LOCK)
+def _fetch_upcoming(today_date_str):
+    """Upcoming events and holidays from the dashboard_upcoming view, soonest first. Cached."""
+    url_upcoming = get_supabase_rest_url(DASHBOARD_UPCOMING_TABLE)
+    params_upcoming = {'select': 'kind,id,name,date,time,description', 'date': 'gte.' + today_date_str, 'order': 'date.asc'}
+    response_upcoming = SESSION.get(url_upcoming, params=params_upcoming, timeout=5)
+    response_upcoming.raise_for_status() # Errors are not cached
+    return response_upcoming.json()
+
+def _fetch_warden(teacher_email):
+    """The warden row for a teacher, or None if they are not a warden."""
+    url = get_supabase_rest_url(WARDENS_TABLE)
+    params = {'select': 'hostel_name', 'teacher_email': f"eq.{teacher_email}", 'limit': '1'}
+    resp = SESSION.get(url, params=params, timeout=5)
+    if resp.ok and resp.json():
+        return resp.json()[0]
+    return None
+
+def _format_slot(entry):
+    """One timetable row as {start, end, course, venue} for the dashboard template."""
+    courses = entry.get('courses') # Non-null if subject_code matched a course
+    if courses:
+        course = f"{courses['course_name']} ({courses['course_code']})"
+    else:
+        course = entry.get('subject_code') or "Free Period" # Fallback if join fails but code exists
+    return {
+        'start': entry['start_time'],
+        'end': entry['end_time'],
+        'course': course,
+        'venue': entry.get('venue') or 'N/A',
+    }
+
+def _fetch_timetable_for_day(semester, day_of_week):
+    """Timetable rows for one semester and weekday, with course name/code joined from 'courses'."""
+    url_tt = TIMETABLE_URL
+    params_tt = {
+        'select': 'start_time,end_time,venue,subject_code,courses(course_name,course_code)',
+        'semester': f'eq.{semester}',
+        'day_of_week': 'eq.' + day_of_week,
+        'order': 'start_time.asc'
+    }
+    response_tt = SESSION.get(url_tt, params=params_tt, timeout=5)
+    response_tt.raise_for_status()
+    return response_tt.json()
+
 
 @app.route("/")
 @login_required() # User must be logged in to see the dashboard
 def index():
     """Renders the main combined dashboard."""
-    user = session['user']
+    user = g.user
     
     # --- NEW: Redirect parents away from the main index ---
-    if user.get('role') == 'parent':
+    if g.role == 'parent':
         return redirect(url_for('parent_dashboard'))
     
     events_data = []
@@ -332,101 +662,65 @@ def index():
     daily_schedule = []
     today_is_holiday = False
     
-    IST = ZoneInfo("Asia/Kolkata")
-    today = datetime.datetime.now(IST) 
-    today_str = today.strftime('%a').upper() 
-    today_date_str = today.strftime('%Y-%m-%d')
+    today = datetime.datetime.now(_IST) 
+    today_str = _WEEKDAY[today.weekday()] 
+    today_date_str = today.date().isoformat()
     current_month = today.month
 
+    # The warden check, upcoming events/holidays and today's timetable are independent,
+    # so issue them together on the shared pool and only do the formatting afterwards.
+    upcoming_future = SUPABASE_POOL.submit(_fetch_upcoming, today_date_str)
+    warden_future = None
+    tt_future = None
+    if g.role == 'teacher':
+        warden_future = SUPABASE_POOL.submit(_fetch_warden, user.get('teacher_email'))
+    elif g.role == 'student':
+        student_batch = user.get('batch') # e.g., 'b2'
+        # Use the new helper function
+        current_semester = get_current_semester(student_batch, current_month)
+        if current_semester:
+            tt_future = SUPABASE_POOL.submit(_fetch_timetable_for_day, current_semester, today_str)
+        else:
+            logger.warning("Could not determine current semester for batch %s", student_batch)
+
     # Check if teacher is a warden
     is_warden = False
     assigned_hostel = None
-    if user.get('role') == 'teacher':
+    if warden_future:
         try:
-            url = get_supabase_rest_url(WARDENS_TABLE)
-            params = {'teacher_email': f"eq.{user.get('teacher_email')}"}
-            resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=5)
-            if resp.ok and resp.json():
+            warden_info = warden_future.result()
+            if warden_info:
                 is_warden = True
-                assigned_hostel = resp.json()[0].get('hostel_name')
+                assigned_hostel = warden_info.get('hostel_name')
                 session['user']['is_warden'] = True
                 session['user']['hostel_name'] = assigned_hostel
         except Exception as e:
-            print(f"Error checking warden status: {e}")
+            logger.error("Error checking warden status: %s", e)
 
-    # Fetch Events
+    # Events + Holidays (one query against the dashboard_upcoming view)
     try:
-        url_events = get_supabase_rest_url(EVENTS_TABLE)
-        params_events = {'select': '*', 'date': f'gte.{today_date_str}', 'order': 'date.asc'}
-        response_events = requests.get(url_events, headers=SUPABASE_HEADERS, params=params_events, timeout=5)
-        if response_events.ok:
-            events_data = response_events.json()
+        for item in upcoming_future.result():
+            if item.get('kind') == 'holiday':
+                holidays_data.append(item)
+            else:
+                events_data.append(item)
+        # Holidays come back ordered by date from today onwards, so only the first can be today
+        today_is_holiday = bool(holidays_data) and holidays_data[0].get('date') == today_date_str
     except Exception as e:
-        print(f"Error fetching events: {e}")
-        flash("Could not load upcoming events.", "warning")
+        logger.error("Error fetching upcoming events/holidays: %s", e)
+        flash("Could not load upcoming events and holidays.", "warning")
 
-    # Fetch Holidays
-    try:
-        url_holidays = get_supabase_rest_url(HOLIDAYS_TABLE)
-        params_holidays = {'select': '*', 'date': f'gte.{today_date_str}', 'order': 'date.asc'}
-        response_holidays = requests.get(url_holidays, headers=SUPABASE_HEADERS, params=params_holidays, timeout=5)
-        if response_holidays.ok:
-            holidays_data = response_holidays.json()
-            # Check if today is a holiday
-            for holiday in holidays_data:
-                if holiday.get('date') == today_date_str:
-                    today_is_holiday = True
-                    break
-    except Exception as e:
-        print(f"Error fetching holidays: {e}")
-        flash("Could not load upcoming holidays.", "warning")
-
-    # Get Student Schedule (if user is student)
-    if user.get('role') == 'student':
-        if today_str in ["SAT", "SUN"] and not today_is_holiday:
-            # We'll let the DB query handle if there are Sat/Sun classes
-            pass 
-
-        if not today_is_holiday:
-            student_batch = user.get('batch') # e.g., 'b2'
-            # Use the new helper function
-            current_semester = get_current_semester(student_batch, current_month)
-            
-            if current_semester:
-                try:
-                    url_tt = get_supabase_rest_url(TIMETABLE_TABLE)
-                    # Use Supabase join to fetch course name/code from 'courses' table
-                    params_tt = {
-                        'select': 'start_time,end_time,venue,subject_code,courses(course_name,course_code)',
-                        'semester': f'eq.{current_semester}',
-                        'day_of_week': f'eq.{today_str}',
-                        'order': 'start_time.asc'
-                    }
-                    response_tt = requests.get(url_tt, headers=SUPABASE_HEADERS, params=params_tt, timeout=5)
-                    response_tt.raise_for_status()
-                    
-                    fetched_entries = response_tt.json()
-                    
-                    # Format the fetched data for the dashboard
-                    for entry in fetched_entries:
-                        course_details = "Free Period" # Default
-                        if entry.get('courses'): # 'courses' will be non-null if subject_code matched
-                            course_name = entry['courses']['course_name']
-                            course_code = entry['courses']['course_code']
-                            course_details = f"{course_name} ({course_code})"
-                        elif entry.get('subject_code'): # Fallback if join fails but code exists
-                             course_details = entry.get('subject_code')
-
-                        venue = entry.get('venue') or 'N/A'
-                        schedule_str = f"{entry['start_time']} - {entry['end_time']} → {course_details} ({venue})"
-                        daily_schedule.append(schedule_str)
-                
-                except Exception as e:
-                    print(f"Error fetching timetable from DB: {e}")
-                    flash("Could not load today's schedule.", "warning")
-            
-            else:
-                print(f"Could not determine current semester for batch {student_batch}")
+    # Student Schedule (fetched above; discarded on holidays)
+    if tt_future:
+        try:
+            fetched_entries = tt_future.result()
+            if not today_is_holiday:
+                # Slot dicts for the dashboard; dashboard.html does the formatting
+                daily_schedule = [_format_slot(entry) for entry in fetched_entries]
+        except Exception as e:
+            logger.error("Error fetching timetable from DB: %s", e)
+            if not today_is_holiday:
+                flash("Could not load today's schedule.", "warning")
     
     return render_template(
         "dashboard.html", 
@@ -434,13 +728,12 @@ def index():
         events=events_data, 
         holidays=holidays_data, 
         daily_schedule=daily_schedule, 
-        today_is_holiday=today_is_holiday,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY
+        today_is_holiday=today_is_holiday
     )
 
 
 @app.route("/login", methods=["GET", "POST"])
+@limiter.limit(LOGIN_RATE_LIMIT, methods=["POST"])
 def login_page():
     """Handles GET request for login page and POST for login attempt."""
     if request.method == "POST":
@@ -486,13 +779,18 @@ def login_page():
             return render_template("login.html"), 401
 
     # If GET request
-    if 'user' in session:
+    if g.user:
         # --- MODIFICATION: Redirect logged-in parents to their dashboard ---
-        if session['user'].get('role') == 'parent':
+        if g.role == 'parent':
             return redirect(url_for('parent_dashboard'))
         return redirect(url_for('index')) # Redirect other logged-in users to main dashboard
     
-    return render_template("login.html")
+    # Anonymous GET: the page only changes with flashed messages, so let the browser
+    # revalidate by ETag and skip the body on 304 (private: it still depends on the session)
+    response = make_response(render_template("login.html"))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
 
 @app.route("/logout")
 @login_required()
@@ -506,16 +804,17 @@ def logout():
 @app.route("/signup", methods=["GET", "POST"])
 def signup_page():
     if request.method == "POST":
-        roll_no = request.form.get("roll_no", "").strip().lower()
-        student_name = request.form.get("student_name", "").strip()
-        department = request.form.get("department", "").strip()
-        student_email = request.form.get("student_email", "").strip().lower()
-        password = request.form.get("student_password", "").strip()
-        confirm_password = request.form.get("confirm_password", "").strip()
+        form = request.form.to_dict() # One pass over the MultiDict; plain dict lookups below
+        roll_no = form.get("roll_no", "").strip().lower()
+        student_name = form.get("student_name", "").strip()
+        department = form.get("department", "").strip()
+        student_email = form.get("student_email", "").strip().lower()
+        password = form.get("student_password", "").strip()
+        confirm_password = form.get("confirm_password", "").strip()
 
         # --- NEW: Parent fields ---
-        parent_email = request.form.get("parent_email", "").strip().lower()
-        parent_password = request.form.get("parent_password", "").strip()
+        parent_email = form.get("parent_email", "").strip().lower()
+        parent_password = form.get("parent_password", "").strip()
         
         # Basic validation
         if not all([roll_no, student_name, student_email, password, confirm_password, parent_email, parent_password, department]):
@@ -536,40 +835,8 @@ def signup_page():
             flash("Invalid Roll Number format or year. Must start with b22, b23, b24, or b25.", "danger")
             return render_template("signup.html")
 
-        # Check if user already exists
-        try:
-            url_check = get_supabase_rest_url(batch_table)
-            params_check_roll = {'select': 'roll_no', 'roll_no': f'eq.{roll_no}'}
-            params_check_email = {'select': 'student_email', 'student_email': f'eq.{student_email}'}
-            params_check_parent_email = {'select': 'parent_email', 'parent_email': f'eq.{parent_email}'}
-
-
-            response_roll = requests.get(url_check, headers=SUPABASE_HEADERS, params=params_check_roll, timeout=5)
-            response_email = requests.get(url_check, headers=SUPABASE_HEADERS, params=params_check_email, timeout=5)
-            response_parent_email = requests.get(url_check, headers=SUPABASE_HEADERS, params=params_check_parent_email, timeout=5)
-
-
-            if response_roll.ok and response_roll.json():
-                 flash(f"Roll number '{roll_no}' is already registered.", "danger")
-                 return render_template("signup.html")
-            if response_email.ok and response_email.json():
-                 flash(f"Email '{student_email}' is already registered.", "danger")
-                 return render_template("signup.html")
-            if response_parent_email.ok and response_parent_email.json():
-                 flash(f"Parent Email '{parent_email}' is already registered.", "danger")
-                 return render_template("signup.html")
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error checking existing user: {e}")
-            flash("Could not verify user existence. Please try again.", "warning")
-            return render_template("signup.html")
-        except ValueError as e:
-            flash(str(e), "danger")
-            return render_template("signup.html")
-
-        # Hash both passwords
-        hashed_student_password = generate_password_hash(password)
-        hashed_parent_password = generate_password_hash(parent_password)
+        # Hash both passwords (in parallel)
+        hashed_student_password, hashed_parent_password = hash_passwords_pooled(password, parent_password)
 
 
         new_student_data = {
@@ -582,10 +849,46 @@ def signup_page():
             "parent_password": hashed_parent_password # Store the HASH
         }
 
-        # Insert into Supabase
+        # Insert into Supabase. The UNIQUE constraints on roll_no / student_email /
+        # parent_email reject duplicates (409), so no existence pre-checks are needed.
         try:
             url_insert = get_supabase_rest_url(batch_table)
-            response_insert = requests.post(url_insert, headers=SUPABASE_HEADERS, json=new_student_data, timeout=10)
+            response_insert = SESSION.post(url_insert, headers=SUPABASE_HEADERS_MIN, json=new_student_data, timeout=10)
+
+            if response_insert.status_code == 409:
+                duplicate_messages = {
+                    'roll_no': f"Roll number '{roll_no}' is already registered.",
+                    'student_email': f"Email '{student_email}' is already registered.",
+                    'parent_email': f"Parent Email '{parent_email}' is already registered.",
+                }
+                # Postgres only reports the first violated constraint, so look up every
+                # colliding field with a single or= query and report them all at once.
+                collided = []
+                try:
+                    or_filter = ','.join(
+                        f'{column}.eq.{postgrest_quote(value)}'
+                        for column, value in (('roll_no', roll_no), ('student_email', student_email), ('parent_email', parent_email))
+                    )
+                    # At most one row per unique column can collide
+                    params_check = {'select': 'roll_no,student_email,parent_email', 'or': f'({or_filter})', 'limit': '3'}
+                    response_check = SESSION.get(url_insert, params=params_check, timeout=10)
+                    response_check.raise_for_status()
+                    values = {'roll_no': roll_no, 'student_email': student_email, 'parent_email': parent_email}
+                    for row in response_check.json():
+                        for column, value in values.items():
+                            if row.get(column) == value and column not in collided:
+                                collided.append(column)
+                except Exception as e:
+                    logger.error("Error checking duplicate signup fields: %s", e)
+                if not collided:
+                    column = duplicate_key_column(response_insert, duplicate_messages)
+                    collided = [column] if column else []
+                if not collided:
+                    flash("This student is already registered.", "danger")
+                for column in collided:
+                    flash(duplicate_messages[column], "danger")
+                return render_template("signup.html")
+
             response_insert.raise_for_status()
 
             if response_insert.status_code == 201:
@@ -594,18 +897,18 @@ def signup_page():
             else:
                 error_details = response_insert.json().get('message', 'Unknown error')
                 flash(f"Signup failed: {error_details}", "danger")
-                print(f"Supabase signup error response: {response_insert.text}")
+                logger.error("Supabase signup error response: %s", response_insert.text)
                 return render_template("signup.html")
 
         except requests.exceptions.RequestException as e:
-            print(f"Error inserting user: {e}")
+            logger.error("Error inserting user: %s", e)
             flash("Signup failed due to a network or server error. Please try again.", "danger")
             return render_template("signup.html")
         except ValueError as e:
             flash(str(e), "danger")
             return render_template("signup.html")
         except Exception as e:
-            print(f"Unexpected error during signup: {e}")
+            logger.exception("Unexpected error during signup")
             flash("An unexpected error occurred during signup.", "danger")
             return render_template("signup.html")
 
@@ -643,8 +946,8 @@ def forgot_password_page():
 @app.route("/student/attendance")
 @login_required(role='student')
 def student_attendance_page():
-     user = session.get('user')
-     if not user or user.get('role') != 'student':
+     user = g.user
+     if not user or g.role != 'student':
          flash("You must be logged in as a student to view this page.", "danger")
          return redirect(url_for('login_page'))
 
@@ -658,16 +961,14 @@ def student_attendance_page():
      return render_template(
          "attendance.html", 
          user=user, 
-         attendance_table=attendance_table,
-         supabase_url=SUPABASE_URL,
-         supabase_key=SUPABASE_ANON_KEY
+         attendance_table=attendance_table
      )
 
 @app.route("/student/marks")
 @login_required(role='student')
 def student_marks_page():
-    user = session.get('user')
-    if not user or user.get('role') != 'student':
+    user = g.user
+    if not user or g.role != 'student':
         flash("You must be logged in as a student to view this page.", "danger")
         return redirect(url_for('login_page'))
     
@@ -689,24 +990,24 @@ def student_marks_page():
         }
     elif batch:
         try:
-            url = f"{SUPABASE_URL}/rest/v1/result_announcements"
+            url = get_supabase_rest_url(RESULT_ANNOUNCEMENTS_TABLE)
             params = {'batch': f'eq.{batch}'}
-            resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+            resp = SESSION.get(url, params=params, timeout=10)
             if resp.ok and resp.json():
                 announcement_status = resp.json()[0]
         except Exception as e:
-            print(f"Error fetching announcements: {e}")
+            logger.error("Error fetching announcements: %s", e)
 
     # Fetch Grades History
     grades_data = {}
     try:
-        url_grades = f"{SUPABASE_URL}/rest/v1/{GRADES_TABLE}"
+        url_grades = get_supabase_rest_url(GRADES_TABLE)
         params_grades = {'roll_no': f'eq.{roll_no}'}
-        resp_grades = requests.get(url_grades, headers=SUPABASE_HEADERS, params=params_grades, timeout=10)
+        resp_grades = SESSION.get(url_grades, params=params_grades, timeout=10)
         if resp_grades.ok and resp_grades.json():
             grades_data = resp_grades.json()[0]
     except Exception as e:
-        print(f"Error fetching grades: {e}")
+        logger.error("Error fetching grades: %s", e)
 
     # MODIFICATION: Pass ALL marks tables, announcement status, and grades data to the template
     return render_template(
@@ -714,9 +1015,7 @@ def student_marks_page():
         user=user, 
         marks_tables=MARKS_TABLES, 
         announcement_status=announcement_status,
-        grades_data=grades_data, # Pass this!
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY
+        grades_data=grades_data # Pass this!
     )
 
 # --- NEW PARENT DASHBOARD ROUTE ---
@@ -724,7 +1023,7 @@ def student_marks_page():
 @login_required(role='parent')
 def parent_dashboard():
     """Renders the parent dashboard."""
-    user = session.get('user') # This user is the parent
+    user = g.user # This user is the parent
     
     student_roll_no = user.get('student_roll_no')
     student_name = user.get('student_name')
@@ -749,15 +1048,44 @@ def parent_dashboard():
         student_roll_no=student_roll_no,
         student_name=student_name,
         attendance_table=attendance_table,
-        marks_table=marks_table,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY
+        marks_table=marks_table
     )
 # --- END OF NEW PARENT ROUTE ---
 
 
 # --- Placeholder Routes for Teacher/Admin Actions (Kept) ---
 
+# A teacher's assigned courses change only when an admin/HOD reassigns a course;
+# keep them in memory (per worker) for 2 minutes so page reloads skip Supabase.
+# Cleared by _invalidate_courses() from the course add/update/delete/assign routes.
+_TEACHER_COURSES_CACHE = TTLCache(maxsize=512, ttl=120)
+_TEACHER_COURSES_CACHE_LOCK = threading.Lock()
+
+@cached(cache=_TEACHER_COURSES_CACHE, lock=_TEACHER_COURSES_CACHE_LOCK)
+def _courses_for_teacher(teacher_username):
+    """Courses (code, name, semester, credits) assigned to a teacher, by semester then name. Cached; errors are not."""
+    params = {
+        'select': 'course_code,course_name,semester,credits',
+        'assisting_teacher': f'eq.{teacher_username}',
+        'order': 'semester.asc,course_name.asc' # Served by idx_courses_teacher_sem_name (teacher_courses_index.sql)
+    }
+    return _get_list_conditional(COURSE_URL, params)
+
+def _fetch_teacher_courses(teacher_username):
+    """
+    Assigned courses for the teacher pages. Flashes a warning when there are none
+    and an error (returning []) when Supabase fails; the pages render either way.
+    """
+    try:
+        courses = _courses_for_teacher(teacher_username)
+    except requests.exceptions.RequestException as e:
+        logger.error("Error fetching courses for teacher %s: %s", teacher_username, e)
+        flash("Error loading your assigned courses.", "danger")
+        return []
+    if not courses:
+        flash(f"You are not currently assigned to any courses. (Checked 'assisting_teacher' column for username: '{teacher_username}').", "warning")
+    return courses
+
 @app.route("/teacher/attendance")
 @login_required(role='teacher')
 def mark_attendance_page():
@@ -765,7 +1093,7 @@ def mark_attendance_page():
     Renders the teacher attendance marking page.
     Fetches courses assigned to the logged-in teacher.
     """
-    user = session.get('user')
+    user = g.user
     # Use 'username' from session, as 'teacher_name' might be the full name
     teacher_username = user.get('username') 
 
@@ -773,40 +1101,15 @@ def mark_attendance_page():
         flash("Could not identify teacher username. Please log in again.", "danger")
         return redirect(url_for('login_page'))
 
-    all_assigned_courses = []
-    try:
-        # Fetch courses assigned to this teacher from the 'courses' table
-        url = get_supabase_rest_url(COURSE_TABLE)
-        # Assumes 'assisting_teacher' column stores the teacher's 'username'
-        # MODIFIED: Added 'credits' to the select query
-        params = {'select': 'course_code,course_name,semester,credits', 'assisting_teacher': f'eq.{teacher_username}'}
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
-        response.raise_for_status() # Raise an exception for bad status codes
-        all_assigned_courses = response.json()
-        
-        if not all_assigned_courses:
-             flash(f"You are not currently assigned to any courses. (Checked 'assisting_teacher' column for username: '{teacher_username}').", "warning")
-             # Still render the page, JS will show "No subjects"
-             
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching courses for teacher {teacher_username}: {e}")
-        flash("Error loading your assigned courses.", "danger")
-        # Render the page anyway, JS will handle empty list
-    except ValueError as e:
-        # This catches get_supabase_rest_url error if COURSE_TABLE is not allowed
-        print(f"Configuration error: {e}")
-        flash("Server configuration error trying to access courses.", "danger")
-        return redirect(url_for('index'))
+    # Courses assigned to this teacher; an empty list still renders, JS will show "No subjects"
+    all_assigned_courses = _fetch_teacher_courses(teacher_username)
 
     # Render the actual template, passing in all the data the JS needs
     return render_template(
         "teacher_attendance.html",
         user=user,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY,
         # Pass the lists as JSON strings for the template to safely embed
-        all_assigned_courses_json=json.dumps(all_assigned_courses),
-        attendance_tables_json=json.dumps(ATTENDANCE_TABLES) 
+        all_assigned_courses_json=to_json(all_assigned_courses)
     )
 
 @app.route("/teacher/marks")
@@ -816,49 +1119,27 @@ def enter_marks_page():
     Renders the teacher marks entry page.
     Fetches courses assigned to the logged-in teacher.
     """
-    user = session.get('user')
+    user = g.user
     teacher_username = user.get('username') 
 
     if not teacher_username:
         flash("Could not identify teacher username. Please log in again.", "danger")
         return redirect(url_for('login_page'))
 
-    all_assigned_courses = []
-    try:
-        # Fetch courses assigned to this teacher from the 'courses' table
-        url = get_supabase_rest_url(COURSE_TABLE)
-        # MODIFICATION: Added 'credits' to the select query
-        params = {'select': 'course_code,course_name,semester,credits', 'assisting_teacher': f'eq.{teacher_username}'}
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
-        response.raise_for_status()
-        all_assigned_courses = response.json()
-        
-        if not all_assigned_courses:
-             flash(f"You are not currently assigned to any courses. (Checked 'assisting_teacher' column for username: '{teacher_username}').", "warning")
-             
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching courses for teacher {teacher_username}: {e}")
-        flash("Error loading your assigned courses.", "danger")
-    except ValueError as e:
-        print(f"Configuration error: {e}")
-        flash("Server configuration error trying to access courses.", "danger")
-        return redirect(url_for('index'))
+    all_assigned_courses = _fetch_teacher_courses(teacher_username)
 
     # Render the new marks template
     return render_template(
         "teacher_marks.html", # <-- New Template
         user=user,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY,
         # Pass the lists as JSON strings for the template to safely embed
-        all_assigned_courses_json=json.dumps(all_assigned_courses),
-        marks_tables_json=json.dumps(MARKS_TABLES) # <-- Pass MARKS_TABLES
+        all_assigned_courses_json=to_json(all_assigned_courses)
     )
 
 @app.route("/teacher/students")
 @login_required(role='teacher')
 def view_student_profiles_page():
-    user = session.get('user')
+    user = g.user
     teacher_username = user.get('username') 
     is_hod = user.get('is_hod')
 
@@ -866,38 +1147,25 @@ def view_student_profiles_page():
         flash("Could not identify teacher username. Please log in again.", "danger")
         return redirect(url_for('login_page'))
 
-    accessible_courses = []
-    try:
-        url = get_supabase_rest_url(COURSE_TABLE)
-        if is_hod:
+    if not is_hod:
+        # Regular teacher sees only their assigned courses (cached, same lookup as the marks/attendance pages)
+        accessible_courses = _fetch_teacher_courses(teacher_username)
+    else:
+        accessible_courses = []
+        try:
             # HOD can see all courses
             params = {'select': 'course_code,course_name,semester,credits', 'order': 'semester.asc,course_name.asc'}
-        else:
-            # Regular teacher sees only their assigned courses
-            params = {'select': 'course_code,course_name,semester,credits', 'assisting_teacher': f'eq.{teacher_username}', 'order': 'semester.asc,course_name.asc'}
-            
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
-        response.raise_for_status()
-        accessible_courses = response.json()
-        
-        if not accessible_courses and not is_hod:
-             flash(f"You are not currently assigned to any courses. (Checked 'assisting_teacher' column for username: '{teacher_username}').", "warning")
-             
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching courses for teacher {teacher_username}: {e}")
-        flash("Error loading your accessible courses.", "danger")
-    except ValueError as e:
-        print(f"Configuration error: {e}")
-        flash("Server configuration error trying to access courses.", "danger")
-        return redirect(url_for('index'))
+            response = SESSION.get(COURSE_URL, params=params, timeout=10)
+            response.raise_for_status()
+            accessible_courses = response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error("Error fetching courses for teacher %s: %s", teacher_username, e)
+            flash("Error loading your accessible courses.", "danger")
 
     return render_template(
         "teacher_performance.html",
         user=user,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY,
-        accessible_courses_json=json.dumps(accessible_courses),
-        marks_tables_json=json.dumps(MARKS_TABLES)
+        accessible_courses_json=to_json(accessible_courses)
     )
 
 # --- Find the old /admin/attendance route and REPLACE it with this ---
@@ -909,16 +1177,16 @@ def admin_mark_attendance_page():
     Renders the admin attendance management page.
     Fetches ALL courses and ALL teachers for the admin to select from.
     """
-    user = session.get('user')
+    user = g.user
     all_courses = []
     all_teachers = [] # <-- Will hold all teacher data
     
     try:
         # Fetch ALL courses from the 'courses' table
-        url = get_supabase_rest_url(COURSE_TABLE)
+        url = COURSE_URL
         # Admin gets ALL courses, ordered by semester. We need assisting_teacher
         params = {'select': 'course_code,course_name,semester,credits,assisting_teacher', 'order': 'semester.asc,course_name.asc'} 
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         all_courses = response.json()
         
@@ -926,11 +1194,11 @@ def admin_mark_attendance_page():
         all_teachers = fetch_all_teachers() # <-- Call the helper function
         
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching all courses/teachers for admin: {e}")
+        logger.error("Error fetching all courses/teachers for admin: %s", e)
         flash("Error loading data.", "danger")
     except ValueError as e:
         # This catches get_supabase_rest_url error
-        print(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         flash("Server configuration error trying to access courses.", "danger")
         return redirect(url_for('admin_dashboard'))
 
@@ -938,64 +1206,58 @@ def admin_mark_attendance_page():
     return render_template(
         "admin_attendance.html", # <-- Render the new template
         user=user,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY,
-        all_courses_json=json.dumps(all_courses), # <-- Pass all courses
-        all_teachers_json=json.dumps(all_teachers), # <-- Pass all teachers
-        attendance_tables_json=json.dumps(ATTENDANCE_TABLES) 
+        all_courses_json=to_json(all_courses), # <-- Pass all courses
+        all_teachers_json=to_json(all_teachers) # <-- Pass all teachers
     )
 
 @app.route("/admin/marks")
 @login_required(role='admin')
 def admin_enter_marks_page():
-    user = session.get('user')
+    user = g.user
     all_courses = []
     all_teachers = []
     
     try:
-        url = get_supabase_rest_url(COURSE_TABLE)
+        url = COURSE_URL
         params = {'select': 'course_code,course_name,semester,credits,assisting_teacher', 'order': 'semester.asc,course_name.asc'} 
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         all_courses = response.json()
         
         all_teachers = fetch_all_teachers()
         
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching all courses/teachers for admin: {e}")
+        logger.error("Error fetching all courses/teachers for admin: %s", e)
         flash("Error loading data.", "danger")
     except ValueError as e:
-        print(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         flash("Server configuration error trying to access courses.", "danger")
         return redirect(url_for('admin_dashboard'))
 
     return render_template(
         "admin_marks.html",
         user=user,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY,
-        all_courses_json=json.dumps(all_courses),
-        all_teachers_json=json.dumps(all_teachers),
-        marks_tables_json=json.dumps(MARKS_TABLES) 
+        all_courses_json=to_json(all_courses),
+        all_teachers_json=to_json(all_teachers)
     )
 
 @app.route("/admin/events")
 @login_required()
 def manage_events_page():
-    user = session.get('user')
-    if not (user.get('role') == 'admin' or (user.get('role') == 'teacher' and user.get('is_hod'))):
+    user = g.user
+    if not (g.role == 'admin' or (g.role == 'teacher' and user.get('is_hod'))):
         flash('Access denied. Required role: Admin or HOD.', 'danger')
         return redirect(url_for('index'))
         
     events = []
     try:
         url = get_supabase_rest_url(EVENTS_TABLE)
-        params = {'select': '*', 'order': 'date.desc'}
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        params = {'select': 'id,name,date,time,description', 'order': 'date.desc'}
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         events = response.json()
     except Exception as e:
-        print(f"Error fetching events: {e}")
+        logger.error("Error fetching events: %s", e)
         flash("Could not load events from the database.", "danger")
 
     return render_template("manage_events.html", events=events, user=user)
@@ -1003,8 +1265,8 @@ def manage_events_page():
 @app.route("/admin/events/add", methods=["POST"])
 @login_required()
 def add_event():
-    user = session.get('user')
-    if not (user.get('role') == 'admin' or (user.get('role') == 'teacher' and user.get('is_hod'))):
+    user = g.user
+    if not (g.role == 'admin' or (g.role == 'teacher' and user.get('is_hod'))):
         flash('Access denied. Required role: Admin or HOD.', 'danger')
         return redirect(url_for('index'))
 
@@ -1026,11 +1288,10 @@ def add_event():
 
     try:
         url = get_supabase_rest_url(EVENTS_TABLE)
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'return=minimal'
         
-        response = requests.post(url, headers=headers, json=new_event_data, timeout=10)
+        response = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=new_event_data, timeout=10)
         response.raise_for_status()
+        _invalidate_upcoming()
         
         if response.status_code == 201:
             flash(f'Event "{name}" added successfully!', 'success')
@@ -1038,7 +1299,7 @@ def add_event():
             flash(f'Received unexpected status: {response.status_code}', 'warning')
             
     except Exception as e:
-        print(f"Error adding event: {e}")
+        logger.error("Error adding event: %s", e)
         flash("An error occurred while adding the event.", "danger")
 
     return redirect(url_for('manage_events_page'))
@@ -1046,24 +1307,23 @@ def add_event():
 @app.route("/admin/events/delete/<int:event_id>", methods=["POST"])
 @login_required()
 def delete_event(event_id):
-    user = session.get('user')
-    if not (user.get('role') == 'admin' or (user.get('role') == 'teacher' and user.get('is_hod'))):
+    user = g.user
+    if not (g.role == 'admin' or (g.role == 'teacher' and user.get('is_hod'))):
         flash('Access denied. Required role: Admin or HOD.', 'danger')
         return redirect(url_for('index'))
 
     try:
         url = get_supabase_rest_url(EVENTS_TABLE)
         params = {'id': f'eq.{event_id}'}
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'return=minimal'
 
-        response = requests.delete(url, headers=headers, params=params, timeout=10)
+        response = SESSION.delete(url, headers=SUPABASE_DELETE_HEADERS, params=params, timeout=10)
         response.raise_for_status()
+        _invalidate_upcoming()
         
         flash("Event deleted successfully.", "success")
         
     except Exception as e:
-        print(f"Error deleting event: {e}")
+        logger.error("Error deleting event: %s", e)
         flash("An error occurred while deleting the event.", "danger")
 
     return redirect(url_for('manage_events_page'))
@@ -1072,18 +1332,26 @@ def delete_event(event_id):
 @login_required(role='admin')
 def admin_dashboard():
     """Renders the admin-specific dashboard."""
-    user = session.get('user')
+    user = g.user
     return render_template("admin_dashboard.html", user=user)
 
 
 # --- Placeholder Routes for Teacher/Admin Actions (Kept) ---
-# ... (your other admin routes like /admin/attendance follow)
+# Flash-and-redirect pages share one view factory instead of one function each.
+# (path, endpoint, message, required role)
+_PLACEHOLDERS = (
+    ("/admin/users", "manage_users_page", "User management not yet implemented.", 'admin'),
+)
 
-@app.route("/admin/users")
-@login_required(role='admin')
-def manage_users_page():
-     flash("User management not yet implemented.", "info")
-     return redirect(url_for('index'))
+def _placeholder(message, role):
+    @login_required(role=role)
+    def view():
+        flash(message, "info")
+        return redirect(url_for('index'))
+    return view
+
+for _path, _endpoint, _message, _role in _PLACEHOLDERS:
+    app.add_url_rule(_path, _endpoint, _placeholder(_message, _role))
 
 # --- START: COURSE MANAGEMENT ROUTES ---
 
@@ -1101,123 +1369,117 @@ def manage_courses_page():
     """Renders the course management page with a list of courses."""
     
     # --- This part fetches ALL data for the dropdowns ---
+    # The teachers, dropdown and filtered course queries are independent; issue them together.
     all_courses_data = []
-    all_teachers = fetch_all_teachers() # You already have this helper
+    teachers_future = SUPABASE_POOL.submit(fetch_all_teachers) # You already have this helper
+    all_courses_future = SUPABASE_POOL.submit(_fetch_course_list) # Cached, shared with the timetable dropdown
     
     try:
         # Fetch ALL courses to power the dynamic search dropdowns
-        url_all_courses = get_supabase_rest_url(COURSE_TABLE)
-        params_all = {'select': 'course_code,course_name,semester,assisting_teacher'}
-        response_all = requests.get(url_all_courses, headers=SUPABASE_HEADERS, params=params_all, timeout=10)
-        response_all.raise_for_status()
-        all_courses_data = response_all.json()
+        all_courses_data = all_courses_future.result()
 
     except Exception as e:
-        print(f"Error fetching all courses/teachers for dropdowns: {e}")
+        logger.error("Error fetching all courses/teachers for dropdowns: %s", e)
         flash("Could not load data for search filters.", "warning")
         # Continue anyway, the search might still work manually
         
     # --- This part (which was already here) fetches the FILTERED courses for the table ---
+    # Filtering and projection happen in Postgres (search_courses RPC, see admin_search.sql)
     filtered_courses = []
-    search_params = {
-        'select': '*',
-        'order': 'semester.asc,course_name.asc'
-    }
-    search_code = request.args.get('search_code', '').strip()
-    search_name = request.args.get('search_name', '').strip()
-    search_teacher = request.args.get('search_teacher', '').strip()
-    search_semester = request.args.get('search_semester', '').strip()
-
-    # Add filters to params if they exist
-    if search_code:
-        search_params['course_code'] = f'eq.{search_code}' # Use 'eq' for exact match from dropdown
-    if search_name:
-         # Name dropdown also uses code as value, so this filter might not be hit,
-         # but we keep it just in case. Or search by code.
-        search_params['course_code'] = f'eq.{search_name}' # Name dropdown value is code
-    if search_teacher:
-        search_params['assisting_teacher'] = f'eq.{search_teacher}' # 'eq' for exact match
-    if search_semester:
-        search_params['semester'] = f'eq.{search_semester}' 
-
-    try:
-        url_filtered = get_supabase_rest_url(COURSE_TABLE)
-        response_filtered = requests.get(url_filtered, headers=SUPABASE_HEADERS, params=search_params, timeout=10)
-        response_filtered.raise_for_status() 
-        filtered_courses = response_filtered.json()
+    has_next = False
+    # Exact matches from the dropdowns; None means "no filter"
+    search_args = _search_args(_COURSE_SEARCH_FIELDS, request.args)
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    filtered_future = SUPABASE_POOL.submit(_call_rpc, 'search_courses', search_args, params=_page_window(page))
+    all_teachers = teachers_future.result()
+    try:
+        filtered_courses = filtered_future.result()
+        has_next = len(filtered_courses) > ADMIN_PAGE_SIZE
+        filtered_courses = filtered_courses[:ADMIN_PAGE_SIZE]
         
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching courses: {e}")
+        logger.error("Error fetching courses: %s", e)
         flash("Could not load courses from the database.", "danger")
     except ValueError as e:
         flash(str(e), "danger")
         return redirect(url_for('admin_dashboard'))
         
     # Pass BOTH all_data (for JS) and filtered_courses (for table)
+    filters = {k: v for k, v in request.args.items() if k != 'page'}
+    prev_url, next_url = _page_links('manage_courses_page', page, has_next, filters)
     return render_template(
         "manage_courses.html", 
-        courses=filtered_courses, # The filtered list to display
-        search_params=request.args,
+        courses=filtered_courses, # The filtered list to display (one page)
+        search_params=filters,
+        page=page,
+        prev_url=prev_url,
+        next_url=next_url,
         all_teachers=all_teachers, # For the "Add Course" form
         
         # New data for the dynamic search dropdowns
-        all_courses_json=json.dumps(all_courses_data),
-        all_teachers_json=json.dumps(all_teachers)
+        all_courses_json=to_json(all_courses_data),
+        all_teachers_json=to_json(all_teachers)
     )
 
+def _insert_courses(rows):
+    """
+    Inserts one or more course rows with a single array POST (one round-trip for a whole batch).
+    Plain insert, not an upsert: an existing course_code still fails with 409. Raises on HTTP errors.
+    """
+    url = COURSE_URL
+    response = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=rows, timeout=10)
+    response.raise_for_status()
+    _invalidate_courses()
+    return response
+
 @app.route('/admin/courses/add', methods=['POST'])
 @login_required(role='admin')
 def add_course():
     """Handles the form submission for adding a new course."""
-    if request.method == 'POST':
-        # Get data from form
-        course_code = request.form.get('course_code', "").strip().upper()
-        course_name = request.form.get('course_name', "").strip()
-        assisting_teacher = request.form.get('assisting_teacher', "").strip()
-        credits = request.form.get('credits')
-        semester = request.form.get('semester')
+    # Get data from form
+    course_code = request.form.get('course_code', "").strip().upper()
+    course_name = request.form.get('course_name', "").strip()
+    assisting_teacher = request.form.get('assisting_teacher', "").strip()
+    credits = request.form.get('credits')
+    semester = request.form.get('semester')
 
-        # Basic validation
-        if not all([course_code, course_name, credits, semester]):
-            flash('Course Code, Name, Credits, and Semester are required.', 'danger')
-            return redirect(url_for('manage_courses_page'))
+    # Basic validation
+    if not all([course_code, course_name, credits, semester]):
+        flash('Course Code, Name, Credits, and Semester are required.', 'danger')
+        return redirect(url_for('manage_courses_page'))
 
-        new_course_data = {
-            "course_code": course_code,
-            "course_name": course_name,
-            "assisting_teacher": assisting_teacher if assisting_teacher else None,
-            "credits": int(credits),
-            "semester": int(semester)
-        }
+    new_course_data = {
+        "course_code": course_code,
+        "course_name": course_name,
+        "assisting_teacher": assisting_teacher if assisting_teacher else None,
+        "credits": int(credits),
+        "semester": int(semester)
+    }
 
-        try:
-            url = get_supabase_rest_url(COURSE_TABLE)
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'return=minimal'
-            
-            response = requests.post(url, headers=headers, json=new_course_data, timeout=10)
-            response.raise_for_status()
+    try:
+        response = _insert_courses([new_course_data])
 
-            if response.status_code == 201:
-                flash(f'Course "{course_name}" added successfully!', 'success')
-            else:
-                flash(f'Received unexpected status: {response.status_code}', 'warning')
+        if response.status_code == 201:
+            flash(f'Course "{course_name}" added successfully!', 'success')
+        else:
+            flash(f'Received unexpected status: {response.status_code}', 'warning')
 
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 409:
-                flash(f'Error: Course code "{course_code}" already exists.', 'danger')
-            else:
-                error_details = e.response.json().get('message', 'Unknown error')
-                flash(f'Error adding course: {error_details}', 'danger')
-                print(f"Supabase add course error: {e.response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error inserting course: {e}")
-            flash("Adding course failed due to a network or server error.", "danger")
-        except ValueError as e:
-            flash(str(e), "danger") 
-        except Exception as e:
-            print(f"Unexpected error adding course: {e}")
-            flash("An unexpected error occurred.", "danger")
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 409:
+            flash(f'Error: Course code "{course_code}" already exists.', 'danger')
+        else:
+            error_details = e.response.json().get('message', 'Unknown error')
+            flash(f'Error adding course: {error_details}', 'danger')
+            logger.error("Supabase add course error: %s", e.response.text)
+    except requests.exceptions.RequestException as e:
+        logger.error("Error inserting course: %s", e)
+        flash("Adding course failed due to a network or server error.", "danger")
+    except ValueError as e:
+        flash(str(e), "danger") 
+    except Exception as e:
+        logger.exception("Unexpected error adding course")
+        flash("An unexpected error occurred.", "danger")
 
     return redirect(url_for('manage_courses_page'))
 
@@ -1226,27 +1488,24 @@ def add_course():
 @login_required(role='admin')
 def delete_course(course_code):
     """Handles the POST request to delete a course."""
-    if request.method == 'POST':
-        try:
-            url = get_supabase_rest_url(COURSE_TABLE)
-            params = {'course_code': f'eq.{course_code}'}
+    try:
+        url = COURSE_URL
+        params = {'course_code': f'eq.{course_code}'}
             
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'return=minimal'
-
-            response = requests.delete(url, headers=headers, params=params, timeout=10)
-            response.raise_for_status()
+        response = SESSION.delete(url, headers=SUPABASE_DELETE_HEADERS, params=params, timeout=10)
+        response.raise_for_status()
+        _invalidate_courses()
             
-            flash(f'Course "{course_code}" deleted successfully.', 'success')
+        flash(f'Course "{course_code}" deleted successfully.', 'success')
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error deleting course: {e}")
-            flash("Deleting course failed due to a network or server error.", "danger")
-        except ValueError as e:
-            flash(str(e), "danger")
-        except Exception as e:
-            print(f"Unexpected error deleting course: {e}")
-            flash("An unexpected error occurred.", "danger")
+    except requests.exceptions.RequestException as e:
+        logger.error("Error deleting course: %s", e)
+        flash("Deleting course failed due to a network or server error.", "danger")
+    except ValueError as e:
+        flash(str(e), "danger")
+    except Exception as e:
+        logger.exception("Unexpected error deleting course")
+        flash("An unexpected error occurred.", "danger")
 
     return redirect(url_for('manage_courses_page'))
 
@@ -1260,11 +1519,11 @@ def edit_course_page(course_code):
     course = None
     all_teachers = fetch_all_teachers()
     try:
-        url = get_supabase_rest_url(COURSE_TABLE)
+        url = COURSE_URL
         # Select the specific course by its code
-        params = {'select': '*', 'course_code': f'eq.{course_code}'}
+        params = {'select': 'course_code,course_name,credits,semester,assisting_teacher', 'course_code': f'eq.{course_code}'}
         
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -1277,7 +1536,7 @@ def edit_course_page(course_code):
             return redirect(url_for('manage_courses_page'))
 
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching course {course_code}: {e}")
+        logger.error("Error fetching course %s: %s", course_code, e)
         flash("Could not load course data for editing.", "danger")
         return redirect(url_for('manage_courses_page'))
     except ValueError as e:
@@ -1289,54 +1548,49 @@ def edit_course_page(course_code):
 @login_required(role='admin')
 def update_course():
     """Handles the form submission for updating an existing course."""
-    if request.method == 'POST':
-        # Get data from form
-        course_code = request.form.get('course_code') # From hidden input
-        course_name = request.form.get('course_name', "").strip()
-        assisting_teacher = request.form.get('assisting_teacher', "").strip()
-        credits = request.form.get('credits')
-        semester = request.form.get('semester')
-
-        if not all([course_code, course_name, credits, semester]):
-            flash('All fields are required.', 'danger')
-            return redirect(url_for('edit_course_page', course_code=course_code))
-
-        # Data to update
-        update_data = {
-            "course_name": course_name,
-            "assisting_teacher": assisting_teacher if assisting_teacher else None,
-            "credits": int(credits),
-            "semester": int(semester)
-        }
+    # Get data from form
+    course_code = request.form.get('course_code') # From hidden input
+    course_name = request.form.get('course_name', "").strip()
+    assisting_teacher = request.form.get('assisting_teacher', "").strip()
+    credits = request.form.get('credits')
+    semester = request.form.get('semester')
 
-        try:
-            url = get_supabase_rest_url(COURSE_TABLE)
-            # Use params to specify WHICH row to update
-            params = {'course_code': f'eq.{course_code}'}
-            
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'return=minimal'
+    if not all([course_code, course_name, credits, semester]):
+        flash('All fields are required.', 'danger')
+        return redirect(url_for('edit_course_page', course_code=course_code))
 
-            # Send a PATCH request with the update_data
-            response = requests.patch(url, headers=headers, params=params, json=update_data, timeout=10)
-            response.raise_for_status()
+    # Data to update
+    update_data = {
+        "course_name": course_name,
+        "assisting_teacher": assisting_teacher if assisting_teacher else None,
+        "credits": int(credits),
+        "semester": int(semester)
+    }
 
-            flash(f'Course "{course_name}" updated successfully!', 'success')
-            return redirect(url_for('manage_courses_page'))
+    try:
+        url = COURSE_URL
+        # Use params to specify WHICH row to update
+        params = {'course_code': f'eq.{course_code}'}
+            
+        # Send a PATCH request with the update_data
+        response = SESSION.patch(url, headers=SUPABASE_HEADERS_MIN, params=params, json=update_data, timeout=10)
+        response.raise_for_status()
+        _invalidate_courses()
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error updating course: {e}")
-            flash("Updating course failed due to a network or server error.", 'danger')
-        except ValueError as e:
-            flash(str(e), "danger")
-        except Exception as e:
-            print(f"Unexpected error updating course: {e}")
-            flash("An unexpected error occurred.", 'danger')
+        flash(f'Course "{course_name}" updated successfully!', 'success')
+        return redirect(url_for('manage_courses_page'))
 
-        # If anything fails, redirect back to the edit page
-        return redirect(url_for('edit_course_page', course_code=course_code))
+    except requests.exceptions.RequestException as e:
+        logger.error("Error updating course: %s", e)
+        flash("Updating course failed due to a network or server error.", 'danger')
+    except ValueError as e:
+        flash(str(e), "danger")
+    except Exception as e:
+        logger.exception("Unexpected error updating course")
+        flash("An unexpected error occurred.", 'danger')
 
-    return redirect(url_for('manage_courses_page'))
+    # If anything fails, redirect back to the edit page
+    return redirect(url_for('edit_course_page', course_code=course_code))
 
 
 # --- END: COURSE MANAGEMENT ROUTES ---
@@ -1350,19 +1604,30 @@ def update_course():
 
 # --- AND REPLACE IT WITH THIS ---
 
+# The teacher roster changes rarely; keep it in memory (per worker) for 5 minutes.
+# Cleared by _invalidate_teachers() from the teacher add/update/delete routes.
+_TEACHERS_CACHE = TTLCache(maxsize=1, ttl=300)
+_TEACHERS_CACHE_LOCK = threading.Lock()
+
+def _invalidate_teachers():
+    with _TEACHERS_CACHE_LOCK:
+        _TEACHERS_CACHE.clear()
+
+@cached(cache=_TEACHERS_CACHE, lock=_TEACHERS_CACHE_LOCK)
+def _fetch_teachers_roster():
+    url = TEACHER_URL
+    params = {
+        'select': 'teacher_id,username,teacher_name,department,teacher_email,teacher_phone,is_hod,hod_department',
+        'order': 'teacher_name.asc'
+    }
+    return _get_list_conditional(url, params) # Errors are not cached
+
 def fetch_all_teachers():
-    """Helper to fetch all teachers without passwords."""
+    """Helper to fetch all teachers without passwords (cached; treat the list as read-only)."""
     try:
-        url = get_supabase_rest_url(TEACHER_TABLE)
-        params = {
-            'select': 'teacher_id,username,teacher_name,department,teacher_email,teacher_phone,is_hod,hod_department',
-            'order': 'teacher_name.asc'
-        }
-        resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
-        if resp.ok:
-            return resp.json()
+        return _fetch_teachers_roster()
     except Exception as e:
-        print(f"Error fetching teachers: {e}")
+        logger.error("Error fetching teachers: %s", e)
     return []
 
 @app.route("/admin/teachers")
@@ -1370,117 +1635,119 @@ def fetch_all_teachers():
 def manage_teachers_page():
     """Renders the teacher management page with a list of teachers."""
     teachers = []
-    
-    search_params = {
-        'select': 'teacher_id,username,teacher_name,department,teacher_email,teacher_phone,is_hod,hod_department', # Include HOD fields
-        'order': 'teacher_name.asc'
-    }
-    
-    search_username = request.args.get('search_username', '').strip()
-    search_name = request.args.get('search_name', '').strip() # Name dropdown uses username as value
+    has_next = False
+    page = max(request.args.get('page', 1, type=int), 1)
+    search_args = _search_args(_TEACHER_SEARCH_FIELDS, request.args)
 
-    # Use 'eq' (exact match) for dropdowns
-    if search_username:
-        search_params['username'] = f'eq.{search_username}'
-    if search_name:
-        search_params['username'] = f'eq.{search_name}' # Both dropdowns will submit the username
+    # The dropdowns need every teacher, not just this page (cached roster)
+    all_teachers_future = SUPABASE_POOL.submit(fetch_all_teachers)
 
     try:
-        url = get_supabase_rest_url(TEACHER_TABLE)
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=search_params, timeout=10)
-        response.raise_for_status() 
-        teachers = response.json()
+        # Exact match; both dropdowns submit the username (search_teachers RPC, see admin_search.sql)
+        teachers = _call_rpc('search_teachers', search_args, params=_page_window(page))
+        has_next = len(teachers) > ADMIN_PAGE_SIZE
+        teachers = teachers[:ADMIN_PAGE_SIZE]
         
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching teachers: {e}")
+        logger.error("Error fetching teachers: %s", e)
         flash("Could not load teachers from the database.", "danger")
     except ValueError as e:
         flash(str(e), "danger")
         return redirect(url_for('admin_dashboard'))
         
-    # Pass the teachers list as JSON for the dropdowns
+    # Pass the full teachers list as JSON for the dropdowns
+    filters = {k: v for k, v in request.args.items() if k != 'page'}
+    prev_url, next_url = _page_links('manage_teachers_page', page, has_next, filters)
     return render_template(
         "manage_teacher.html", 
-        teachers=teachers, 
-        search_params=request.args,
-        all_teachers_json=json.dumps(teachers) # <-- ADDED THIS LINE
+        teachers=teachers, # One page
+        search_params=filters,
+        page=page,
+        prev_url=prev_url,
+        next_url=next_url,
+        all_teachers_json=to_json(all_teachers_future.result()) # <-- ADDED THIS LINE
     )
 
 
+def _insert_teachers(rows):
+    """
+    Inserts one or more teacher rows with a single array POST (one round-trip for a whole batch).
+    Plain insert, not an upsert: a duplicate username/email still fails with 409. Raises on HTTP errors.
+    """
+    url = TEACHER_URL
+    response = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=rows, timeout=10)
+    response.raise_for_status()
+    _invalidate_teachers()
+    return response
+
 @app.route('/admin/teachers/add', methods=['POST'])
 @login_required(role='admin')
 def add_teacher():
     """Handles the form submission for adding a new teacher."""
-    if request.method == 'POST':
-        username = request.form.get('username', "").strip()
-        teacher_name = request.form.get('teacher_name', "").strip()
-        department = request.form.get('department', "").strip()
-        teacher_email = request.form.get('teacher_email', "").strip().lower()
+    username = request.form.get('username', "").strip()
+    teacher_name = request.form.get('teacher_name', "").strip()
+    department = request.form.get('department', "").strip()
+    teacher_email = request.form.get('teacher_email', "").strip().lower()
         
-        # Use a default password
-        default_password = "password" 
+    # Use a default password
+    default_password = "password" 
 
-        if not all([username, teacher_name, teacher_email]): 
-            flash('Username, Name, and Email are required.', 'danger')
-            return redirect(url_for('manage_teachers_page'))
+    if not all([username, teacher_name, teacher_email]): 
+        flash('Username, Name, and Email are required.', 'danger')
+        return redirect(url_for('manage_teachers_page'))
         
-        # Hash the default password
-        hashed_password = generate_password_hash(default_password)
-
-        new_teacher_data = {
-            "username": username,
-            "teacher_name": teacher_name,
-            "department": department if department else None,
-            "teacher_email": teacher_email,
-            "teacher_phone": request.form.get('teacher_phone', "").strip(),
-            "teacher_password": hashed_password, # Store the hash of the default password
-            "is_hod": request.form.get('is_hod') == 'true',
-            "hod_department": request.form.get('hod_department') if request.form.get('is_hod') == 'true' else None
-        }
+    # Hash the default password
+    hashed_password = hash_password(default_password)
+
+    new_teacher_data = {
+        "username": username,
+        "teacher_name": teacher_name,
+        "department": department if department else None,
+        "teacher_email": teacher_email,
+        "teacher_phone": request.form.get('teacher_phone', "").strip(),
+        "teacher_password": hashed_password, # Store the hash of the default password
+        "is_hod": request.form.get('is_hod') == 'true',
+        "hod_department": request.form.get('hod_department') if request.form.get('is_hod') == 'true' else None
+    }
 
-        try:
-            url = get_supabase_rest_url(TEACHER_TABLE)
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'return=minimal'
-            
-            response = requests.post(url, headers=headers, json=new_teacher_data, timeout=10)
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+    try:
+        response = _insert_teachers([new_teacher_data]) # Raises HTTPError for bad responses (4xx or 5xx)
 
-            # Check status code explicitly after raise_for_status might not be strictly needed,
-            # but doesn't hurt for clarity. raise_for_status handles non-2xx codes.
-            if response.status_code == 201:
-                flash(f'Teacher "{teacher_name}" added successfully with a default password!', 'success')
-            else:
-                # This part might be less likely reached if raise_for_status is used effectively
-                flash(f'Received unexpected status: {response.status_code}', 'warning')
+        # Check status code explicitly after raise_for_status might not be strictly needed,
+        # but doesn't hurt for clarity. raise_for_status handles non-2xx codes.
+        if response.status_code == 201:
+            flash(f'Teacher "{teacher_name}" added successfully with a default password!', 'success')
+        else:
+            # This part might be less likely reached if raise_for_status is used effectively
+            flash(f'Received unexpected status: {response.status_code}', 'warning')
                 
-        except requests.exceptions.HTTPError as e:
-             # Handle specific errors like conflicts (409)
-             if e.response.status_code == 409: 
-                 error_details = e.response.json().get('message', '')
-                 if 'username' in error_details:
-                     flash(f'Error: Username "{username}" already exists.', 'danger')
-                 elif 'teacher_email' in error_details:
-                     flash(f'Error: Email "{teacher_email}" already exists.', 'danger')
-                 else:
-                     # Generic conflict message if details are unclear
-                     flash(f'Error: Username or Email already exists.', 'danger')
+    except requests.exceptions.HTTPError as e:
+         # Handle specific errors like conflicts (409)
+         if e.response.status_code == 409: 
+             error_details = e.response.json().get('message', '')
+             if 'username' in error_details:
+                 flash(f'Error: Username "{username}" already exists.', 'danger')
+             elif 'teacher_email' in error_details:
+                 flash(f'Error: Email "{teacher_email}" already exists.', 'danger')
              else:
-                 # Handle other HTTP errors (like 400 Bad Request, 500 Server Error)
-                 error_details = e.response.json().get('message', 'Unknown HTTP error')
-                 flash(f'Error adding teacher: {error_details}', 'danger')
-                 print(f"Supabase add teacher HTTP error: {e.response.text}")
-        except requests.exceptions.RequestException as e:
-            # Handle network errors (connection timeout, DNS issues etc.)
-            print(f"Error inserting teacher (Network/Request): {e}")
-            flash("Adding teacher failed due to a network or server connection error.", "danger")
-        except ValueError as e:
-            # Handle errors from get_supabase_rest_url (invalid table)
-            flash(str(e), "danger") 
-        except Exception as e:
-            # Catch any other unexpected errors during the process
-            print(f"Unexpected error adding teacher: {e}")
-            flash("An unexpected error occurred while adding the teacher.", "danger")
+                 # Generic conflict message if details are unclear
+                 flash(f'Error: Username or Email already exists.', 'danger')
+         else:
+             # Handle other HTTP errors (like 400 Bad Request, 500 Server Error)
+             error_details = e.response.json().get('message', 'Unknown HTTP error')
+             flash(f'Error adding teacher: {error_details}', 'danger')
+             logger.error("Supabase add teacher HTTP error: %s", e.response.text)
+    except requests.exceptions.RequestException as e:
+        # Handle network errors (connection timeout, DNS issues etc.)
+        logger.error("Error inserting teacher (Network/Request): %s", e)
+        flash("Adding teacher failed due to a network or server connection error.", "danger")
+    except ValueError as e:
+        # Handle errors from get_supabase_rest_url (invalid table)
+        flash(str(e), "danger") 
+    except Exception as e:
+        # Catch any other unexpected errors during the process
+        logger.exception("Unexpected error adding teacher")
+        flash("An unexpected error occurred while adding the teacher.", "danger")
 
     return redirect(url_for('manage_teachers_page'))
 
@@ -1489,34 +1756,31 @@ def add_teacher():
 @login_required(role='admin')
 def delete_teacher(teacher_id):
     """Handles the POST request to delete a teacher."""
-    if request.method == 'POST':
-        try:
-            url = get_supabase_rest_url(TEACHER_TABLE)
-            params = {'teacher_id': f'eq.{teacher_id}'} # Use teacher_id
+    try:
+        url = TEACHER_URL
+        params = {'teacher_id': f'eq.{teacher_id}'} # Use teacher_id
             
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'return=minimal'
-
-            response = requests.delete(url, headers=headers, params=params, timeout=10)
-            response.raise_for_status()
+        response = SESSION.delete(url, headers=SUPABASE_DELETE_HEADERS, params=params, timeout=10)
+        response.raise_for_status()
+        _invalidate_teachers()
             
-            # Check if deletion actually happened (optional, Supabase might not return count)
-            # You might need to adjust based on actual Supabase behavior or just assume success on 2xx
-            flash(f'Teacher deleted successfully.', 'success')
-
-        except requests.exceptions.HTTPError as e:
-             # Handle cases where the teacher might not exist (404) or other errors
-             error_details = e.response.json().get('message', 'Could not delete teacher')
-             flash(f'Error deleting teacher: {error_details}', 'danger')
-             print(f"Supabase delete teacher HTTP error: {e.response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error deleting teacher (Network/Request): {e}")
-            flash("Deleting teacher failed due to a network or server error.", "danger")
-        except ValueError as e:
-            flash(str(e), "danger")
-        except Exception as e:
-            print(f"Unexpected error deleting teacher: {e}")
-            flash("An unexpected error occurred while deleting the teacher.", "danger")
+        # Check if deletion actually happened (optional, Supabase might not return count)
+        # You might need to adjust based on actual Supabase behavior or just assume success on 2xx
+        flash(f'Teacher deleted successfully.', 'success')
+
+    except requests.exceptions.HTTPError as e:
+         # Handle cases where the teacher might not exist (404) or other errors
+         error_details = e.response.json().get('message', 'Could not delete teacher')
+         flash(f'Error deleting teacher: {error_details}', 'danger')
+         logger.error("Supabase delete teacher HTTP error: %s", e.response.text)
+    except requests.exceptions.RequestException as e:
+        logger.error("Error deleting teacher (Network/Request): %s", e)
+        flash("Deleting teacher failed due to a network or server error.", "danger")
+    except ValueError as e:
+        flash(str(e), "danger")
+    except Exception as e:
+        logger.exception("Unexpected error deleting teacher")
+        flash("An unexpected error occurred while deleting the teacher.", "danger")
 
     return redirect(url_for('manage_teachers_page'))
 
@@ -1527,11 +1791,11 @@ def edit_teacher_page(teacher_id):
     """Shows the form to edit a specific teacher."""
     teacher = None
     try:
-        url = get_supabase_rest_url(TEACHER_TABLE)
+        url = TEACHER_URL
         # Select specific fields excluding password
         params = {'select': 'teacher_id,username,teacher_name,department,teacher_email,teacher_phone,is_hod,hod_department', 'teacher_id': f'eq.{teacher_id}'}
         
-        response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -1544,7 +1808,7 @@ def edit_teacher_page(teacher_id):
             return redirect(url_for('manage_teachers_page'))
 
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching teacher {teacher_id}: {e}")
+        logger.error("Error fetching teacher %s: %s", teacher_id, e)
         flash("Could not load teacher data for editing.", "danger")
         return redirect(url_for('manage_teachers_page'))
     except ValueError as e:
@@ -1556,64 +1820,59 @@ def edit_teacher_page(teacher_id):
 @login_required(role='admin')
 def update_teacher():
     """Handles the form submission for updating an existing teacher."""
-    if request.method == 'POST':
-        teacher_id = request.form.get('teacher_id')
-        teacher_name = request.form.get('teacher_name', "").strip()
-        department = request.form.get('department', "").strip()
-        teacher_email = request.form.get('teacher_email', "").strip().lower()
-        # Password field removed from form data retrieval
-
-        if not all([teacher_id, teacher_name, teacher_email]):
-            flash('Name and Email are required.', 'danger')
-            # Redirect back to the edit page for the specific teacher
-            return redirect(url_for('edit_teacher_page', teacher_id=teacher_id))
-
-        # Data to update, excluding password
-        update_data = {
-            "teacher_name": teacher_name,
-            "department": department if department else None,
-            "teacher_email": teacher_email,
-            "teacher_phone": request.form.get('teacher_phone', "").strip(),
-            "is_hod": request.form.get('is_hod') == 'true',
-            "hod_department": request.form.get('hod_department') if request.form.get('is_hod') == 'true' else None
-        }
+    teacher_id = request.form.get('teacher_id')
+    teacher_name = request.form.get('teacher_name', "").strip()
+    department = request.form.get('department', "").strip()
+    teacher_email = request.form.get('teacher_email', "").strip().lower()
+    # Password field removed from form data retrieval
+
+    if not all([teacher_id, teacher_name, teacher_email]):
+        flash('Name and Email are required.', 'danger')
+        # Redirect back to the edit page for the specific teacher
+        return redirect(url_for('edit_teacher_page', teacher_id=teacher_id))
 
-        # Removed the logic block that checked for and hashed a new password
+    # Data to update, excluding password
+    update_data = {
+        "teacher_name": teacher_name,
+        "department": department if department else None,
+        "teacher_email": teacher_email,
+        "teacher_phone": request.form.get('teacher_phone', "").strip(),
+        "is_hod": request.form.get('is_hod') == 'true',
+        "hod_department": request.form.get('hod_department') if request.form.get('is_hod') == 'true' else None
+    }
 
-        try:
-            url = get_supabase_rest_url(TEACHER_TABLE)
-            params = {'teacher_id': f'eq.{teacher_id}'}
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'return=minimal'
+    # Removed the logic block that checked for and hashed a new password
 
-            response = requests.patch(url, headers=headers, params=params, json=update_data, timeout=10)
-            response.raise_for_status()
+    try:
+        url = TEACHER_URL
+        params = {'teacher_id': f'eq.{teacher_id}'}
 
-            flash(f'Teacher "{teacher_name}" updated successfully!', 'success')
-            # Redirect to the main teacher list page after successful update
-            return redirect(url_for('manage_teachers_page'))
+        response = SESSION.patch(url, headers=SUPABASE_HEADERS_MIN, params=params, json=update_data, timeout=10)
+        response.raise_for_status()
+        _invalidate_teachers()
 
-        except requests.exceptions.HTTPError as e:
-             if e.response.status_code == 409: # conflict checking for email uniqueness
-                 flash(f'Error: Email "{teacher_email}" is already in use by another teacher.', 'danger')
-             else:
-                 error_details = e.response.json().get('message', 'Unknown error')
-                 flash(f'Error updating teacher: {error_details}', 'danger')
-                 print(f"Supabase update teacher HTTP error: {e.response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error updating teacher (Network/Request): {e}")
-            flash("Updating teacher failed due to a network or server connection error.", 'danger')
-        except ValueError as e: # Catches potential errors from get_supabase_rest_url
-            flash(str(e), "danger")
-        except Exception as e:
-            print(f"Unexpected error updating teacher: {e}")
-            flash("An unexpected error occurred while updating the teacher.", 'danger')
+        flash(f'Teacher "{teacher_name}" updated successfully!', 'success')
+        # Redirect to the main teacher list page after successful update
+        return redirect(url_for('manage_teachers_page'))
 
-        # If any error occurs, redirect back to the edit page for the same teacher
-        return redirect(url_for('edit_teacher_page', teacher_id=teacher_id))
+    except requests.exceptions.HTTPError as e:
+         if e.response.status_code == 409: # conflict checking for email uniqueness
+             flash(f'Error: Email "{teacher_email}" is already in use by another teacher.', 'danger')
+         else:
+             error_details = e.response.json().get('message', 'Unknown error')
+             flash(f'Error updating teacher: {error_details}', 'danger')
+             logger.error("Supabase update teacher HTTP error: %s", e.response.text)
+    except requests.exceptions.RequestException as e:
+        logger.error("Error updating teacher (Network/Request): %s", e)
+        flash("Updating teacher failed due to a network or server connection error.", 'danger')
+    except ValueError as e: # Catches potential errors from get_supabase_rest_url
+        flash(str(e), "danger")
+    except Exception as e:
+        logger.exception("Unexpected error updating teacher")
+        flash("An unexpected error occurred while updating the teacher.", 'danger')
 
-    # If not POST, redirect to the main teacher list (though typically accessed via GET on edit_teacher_page)
-    return redirect(url_for('manage_teachers_page'))
+    # If any error occurs, redirect back to the edit page for the same teacher
+    return redirect(url_for('edit_teacher_page', teacher_id=teacher_id))
 # --- END: TEACHER MANAGEMENT ROUTES ---
 
 
@@ -1626,34 +1885,21 @@ def manage_timetable_page():
     timetable_entries = {} # Will be grouped by day
 
     try:
-        # Fetch all courses to populate the "Add Entry" dropdown
-        url_courses = get_supabase_rest_url(COURSE_TABLE)
-        params_courses = {'select': 'course_code,course_name,semester', 'order': 'semester.asc,course_name.asc'}
-        response_courses = requests.get(url_courses, headers=SUPABASE_HEADERS, params=params_courses, timeout=10)
-        response_courses.raise_for_status()
-        all_courses = response_courses.json()
-
+        # All courses for the "Add Entry" dropdown (cached), fetched alongside the timetable
+        courses_future = SUPABASE_POOL.submit(_fetch_course_list)
+        tt_future = None
         if selected_semester:
-            # If a semester is selected, fetch its existing timetable
-            url_tt = get_supabase_rest_url(TIMETABLE_TABLE)
-            # Join with courses table to get subject names
-            params_tt = {
-                'select': 'id,day_of_week,start_time,end_time,subject_code,venue,courses(course_name)',
-                'semester': f'eq.{selected_semester}',
-                'order': 'day_of_week.asc,start_time.asc'
-            }
-            response_tt = requests.get(url_tt, headers=SUPABASE_HEADERS, params=params_tt, timeout=10)
-            response_tt.raise_for_status()
-            
-            # Group the flat list of entries into a dictionary by day
-            for entry in response_tt.json():
-                day = entry['day_of_week']
-                if day not in timetable_entries:
-                    timetable_entries[day] = []
-                timetable_entries[day].append(entry)
+            # If a semester is selected, fetch its existing timetable, already grouped by day
+            # with subject names joined in (timetable_grouped RPC, see timetable_grouped.sql)
+            tt_future = SUPABASE_POOL.submit(_call_rpc, "timetable_grouped", {'p_semester': selected_semester})
+
+        all_courses = courses_future.result()
+
+        if tt_future:
+            timetable_entries = tt_future.result()
 
     except Exception as e:
-        print(f"Error loading timetable page: {e}")
+        logger.error("Error loading timetable page: %s", e)
         flash(f"Error loading data: {e}", "danger")
 
     return render_template(
@@ -1664,6 +1910,25 @@ def manage_timetable_page():
     )
 
 
+# The course dropdowns (timetable, course search filters) change rarely and are the same for every admin;
+# keep it in memory (per worker) for 5 minutes. Cleared by _invalidate_courses()
+# from the course add/update/delete/assign routes.
+_COURSE_LIST_CACHE = TTLCache(maxsize=1, ttl=300)
+_COURSE_LIST_CACHE_LOCK = threading.Lock()
+
+def _invalidate_courses():
+    with _COURSE_LIST_CACHE_LOCK:
+        _COURSE_LIST_CACHE.clear()
+    with _TEACHER_COURSES_CACHE_LOCK:
+        _TEACHER_COURSES_CACHE.clear()
+
+@cached(cache=_COURSE_LIST_CACHE, lock=_COURSE_LIST_CACHE_LOCK)
+def _fetch_course_list():
+    """All courses (code, name, semester, teacher) ordered for the admin dropdowns. Cached; errors are not."""
+    url_courses = COURSE_URL
+    params_courses = {'select': 'course_code,course_name,semester,assisting_teacher', 'order': 'semester.asc,course_name.asc'}
+    return _get_list_conditional(url_courses, params_courses)
+
 @app.route("/admin/timetable/add", methods=['POST'])
 @login_required(role='admin')
 def add_timetable_entry():
@@ -1689,17 +1954,15 @@ def add_timetable_entry():
             "venue": venue
         }
         
-        url = get_supabase_rest_url(TIMETABLE_TABLE)
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'return=minimal' # We don't need the data back
+        url = TIMETABLE_URL
         
-        response = requests.post(url, headers=headers, json=new_entry, timeout=10)
+        response = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=new_entry, timeout=10)
         response.raise_for_status() # Will error on failure
         
         flash("Timetable entry added successfully!", "success")
 
     except Exception as e:
-        print(f"Error adding timetable entry: {e}")
+        logger.error("Error adding timetable entry: %s", e)
         flash(f"Error adding entry: {e}", "danger")
     
     return redirect(url_for('manage_timetable_page', semester=semester))
@@ -1711,18 +1974,16 @@ def delete_timetable_entry(entry_id):
     """Handles deleting a timetable entry by its ID."""
     semester = request.form.get('semester') # Get semester from hidden form for redirect
     try:
-        url = get_supabase_rest_url(TIMETABLE_TABLE)
+        url = TIMETABLE_URL
         params = {'id': f'eq.{entry_id}'} # Delete where id matches
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'return=minimal'
         
-        response = requests.delete(url, headers=headers, params=params, timeout=10)
+        response = SESSION.delete(url, headers=SUPABASE_DELETE_HEADERS, params=params, timeout=10)
         response.raise_for_status()
         
         flash("Entry deleted successfully.", "success")
     
     except Exception as e:
-        print(f"Error deleting entry: {e}")
+        logger.error("Error deleting entry: %s", e)
         flash(f"Error deleting entry: {e}", "danger")
 
     return redirect(url_for('manage_timetable_page', semester=semester))
@@ -1735,8 +1996,8 @@ def delete_timetable_entry(entry_id):
 @login_required()
 def get_notifications():
     """Fetches notifications for the logged-in user and calculates unread count."""
-    user = session.get('user')
-    role = user.get('role')
+    user = g.user
+    role = g.role
     
     if role not in ['student', 'teacher', 'admin']:
         return jsonify({'notifications': [], 'unread_count': 0})
@@ -1746,7 +2007,7 @@ def get_notifications():
         url_notif = get_supabase_rest_url(NOTIFICATIONS_TABLE)
         # Order by created_at descending
         params_notif = {'select': '*', 'order': 'created_at.desc'}
-        resp_notif = requests.get(url_notif, headers=SUPABASE_HEADERS, params=params_notif, timeout=5)
+        resp_notif = SESSION.get(url_notif, params=params_notif, timeout=5)
         resp_notif.raise_for_status()
         all_notifications = resp_notif.json()
         
@@ -1755,7 +2016,7 @@ def get_notifications():
         
         url_reads = get_supabase_rest_url(NOTIFICATION_READS_TABLE)
         params_reads = {'select': 'notification_id', 'roll_no': f'eq.{user_id_for_reads}'}
-        resp_reads = requests.get(url_reads, headers=SUPABASE_HEADERS, params=params_reads, timeout=5)
+        resp_reads = SESSION.get(url_reads, params=params_reads, timeout=5)
         resp_reads.raise_for_status()
         read_notifications = {item['notification_id'] for item in resp_reads.json()}
         
@@ -1788,7 +2049,7 @@ def get_notifications():
         return jsonify({'notifications': filtered_notifications, 'unread_count': unread_count})
 
     except Exception as e:
-        print(f"Error fetching notifications: {e}")
+        logger.error("Error fetching notifications: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -1798,8 +2059,8 @@ def mark_notification_read():
     """Marks a notification as read by the user."""
     data = request.json
     notification_id = data.get('notification_id')
-    user = session.get('user')
-    user_id_for_reads = user.get('roll_no') if user.get('role') == 'student' else user.get('username')
+    user = g.user
+    user_id_for_reads = user.get('roll_no') if g.role == 'student' else user.get('username')
     
     if not notification_id or not user_id_for_reads:
         return jsonify({'success': False}), 400
@@ -1807,20 +2068,18 @@ def mark_notification_read():
     try:
         url = get_supabase_rest_url(NOTIFICATION_READS_TABLE)
         # Attempt to insert, ignore if already exists (depends on DB constraints, but we have UNIQUE on notification_id + roll_no)
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'return=minimal'
         payload = {
             'notification_id': notification_id,
             'roll_no': user_id_for_reads
         }
-        res = requests.post(url, headers=headers, json=payload, timeout=5)
+        res = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=payload, timeout=5)
         # 409 means it already exists, which is fine (already read)
         if res.status_code not in [201, 409]:
             res.raise_for_status()
             
         return jsonify({'success': True})
     except Exception as e:
-        print(f"Error marking notification read: {e}")
+        logger.error("Error marking notification read: %s", e)
         return jsonify({'success': False}), 500
 
 
@@ -1828,10 +2087,10 @@ def mark_notification_read():
 @login_required()
 def notifications_page():
     """Renders unified notifications page and handles POST to send a new notification."""
-    user = session.get('user')
+    user = g.user
     
     if request.method == "POST":
-        if user.get('role') not in ['teacher', 'admin']:
+        if g.role not in ['teacher', 'admin']:
             flash("Unauthorized to send notifications.", "danger")
             return redirect(url_for('notifications_page'))
 
@@ -1853,13 +2112,11 @@ def notifications_page():
         
         try:
             url = get_supabase_rest_url(NOTIFICATIONS_TABLE)
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'return=minimal'
-            res = requests.post(url, headers=headers, json=payload, timeout=5)
+            res = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=payload, timeout=5)
             res.raise_for_status()
             flash("Notification sent successfully!", "success")
         except Exception as e:
-            print(f"Error sending notification: {e}")
+            logger.error("Error sending notification: %s", e)
             flash("Error sending notification.", "danger")
             
         return redirect(url_for('notifications_page'))
@@ -1872,7 +2129,7 @@ def notifications_page():
 @login_required(role='admin')
 def admin_batch_promotion_page():
     """Renders the batch promotion management page."""
-    user = session.get('user')
+    user = g.user
     
     batch_counts = {}
     year_back_students = []
@@ -1882,8 +2139,8 @@ def admin_batch_promotion_page():
     
     try:
         # Fetch Result Announcements
-        url_ann = f"{SUPABASE_URL}/rest/v1/result_announcements"
-        resp_ann = requests.get(url_ann, headers=SUPABASE_HEADERS, timeout=10)
+        url_ann = get_supabase_rest_url(RESULT_ANNOUNCEMENTS_TABLE)
+        resp_ann = SESSION.get(url_ann, timeout=10)
         if resp_ann.ok:
             announcements = resp_ann.json()
 
@@ -1891,7 +2148,7 @@ def admin_batch_promotion_page():
         for batch in ALL_STUDENT_TABLES:
             url = get_supabase_rest_url(batch)
             params = {'select': 'roll_no'} 
-            response = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+            response = SESSION.get(url, params=params, timeout=10)
             if response.ok:
                 batch_counts[batch] = len(response.json())
             else:
@@ -1899,26 +2156,26 @@ def admin_batch_promotion_page():
 
         # Fetch Year-Back Students
         url_yb = get_supabase_rest_url(YEAR_BACK_TABLE)
-        response_yb = requests.get(url_yb, headers=SUPABASE_HEADERS, timeout=10)
+        response_yb = SESSION.get(url_yb, timeout=10)
         if response_yb.ok:
             year_back_students = response_yb.json()
 
         # Fetch Active Backlogs
         url_bl = get_supabase_rest_url(BACKLOG_TABLE)
         params_bl = {'status': 'eq.active'}
-        response_bl = requests.get(url_bl, headers=SUPABASE_HEADERS, params=params_bl, timeout=10)
+        response_bl = SESSION.get(url_bl, params=params_bl, timeout=10)
         if response_bl.ok:
             active_backlogs = response_bl.json()
 
         # Fetch Promotion Logs
         url_pl = get_supabase_rest_url(PROMOTION_LOG_TABLE)
         params_pl = {'order': 'promoted_at.desc'}
-        response_pl = requests.get(url_pl, headers=SUPABASE_HEADERS, params=params_pl, timeout=10)
+        response_pl = SESSION.get(url_pl, params=params_pl, timeout=10)
         if response_pl.ok:
             promotion_logs = response_pl.json()
 
     except Exception as e:
-        print(f"Error loading batch promotion data: {e}")
+        logger.error("Error loading batch promotion data: %s", e)
         flash("Some data could not be loaded.", "warning")
 
     return render_template(
@@ -1936,7 +2193,7 @@ def admin_batch_promotion_page():
 @login_required(role='admin')
 def promote_batches():
     """Handles the heavy lifting of promoting students across batches."""
-    admin_user = session.get('user')
+    admin_user = g.user
     promoted_by = admin_user.get('username')
     
     results = {
@@ -1948,14 +2205,14 @@ def promote_batches():
     try:
         # 1. Get all year-back roll numbers to exclude
         url_yb = get_supabase_rest_url(YEAR_BACK_TABLE)
-        resp_yb = requests.get(url_yb, headers=SUPABASE_HEADERS, timeout=10)
+        resp_yb = SESSION.get(url_yb, timeout=10)
         year_back_rolls = [s['roll_no'] for s in resp_yb.json()] if resp_yb.ok else []
         results['year_back_skipped'] = len(year_back_rolls)
 
         # Helper to move students
         def move_students(from_table, to_table):
             url_from = get_supabase_rest_url(from_table)
-            resp_from = requests.get(url_from, headers=SUPABASE_HEADERS, timeout=30)
+            resp_from = SESSION.get(url_from, timeout=30)
             if not resp_from.ok: return 0
             
             students = resp_from.json()
@@ -1972,15 +2229,15 @@ def promote_batches():
                 sc.pop('id', None)
                 students_payload.append(sc)
             
-            resp_to = requests.post(url_to, headers=SUPABASE_HEADERS, json=students_payload, timeout=30)
+            resp_to = SESSION.post(url_to, headers=SUPABASE_HEADERS_MIN, json=students_payload, timeout=30)
             if not resp_to.ok:
-                print(f"Error moving to {to_table}: {resp_to.text}")
+                logger.error("Error moving to %s: %s", to_table, resp_to.text)
                 raise Exception(f"Failed to insert into {to_table}")
             
             # Delete from from_table
             for s in to_move:
                 delete_params = {'roll_no': f"eq.{s['roll_no']}"}
-                requests.delete(url_from, headers=SUPABASE_HEADERS, params=delete_params, timeout=10)
+                SESSION.delete(url_from, headers=SUPABASE_DELETE_HEADERS, params=delete_params, timeout=10)
             
             return len(to_move)
 
@@ -1995,7 +2252,7 @@ def promote_batches():
         results['promoted'] += move_students('b1', 'b2')
 
         # 5. Reset Result Announcements for all promoted batches
-        url_ann = f"{SUPABASE_URL}/rest/v1/result_announcements"
+        url_ann = get_supabase_rest_url(RESULT_ANNOUNCEMENTS_TABLE)
         reset_payload = {
             'mid1_announced': False,
             'mid2_announced': False,
@@ -2003,13 +2260,13 @@ def promote_batches():
             'updated_at': datetime.datetime.now().isoformat()
         }
         # Reset all announcement toggles
-        requests.patch(url_ann, headers=SUPABASE_HEADERS, json=reset_payload, timeout=10)
+        SESSION.patch(url_ann, json=reset_payload, timeout=10)
 
         # 6. CLEAR MARKS TABLES (Clean Slate for new academic year)
         # We clear the marks table that the batch just finished using.
         for i in range(1, 5):
             m_table = f"marks{i}"
-            requests.delete(f"{SUPABASE_URL}/rest/v1/{m_table}", headers=SUPABASE_HEADERS, params={'roll_no': 'neq.0'}, timeout=10)
+            SESSION.delete(get_supabase_rest_url(m_table), headers=SUPABASE_DELETE_HEADERS, params={'roll_no': 'neq.0'}, timeout=10)
 
         # 7. Log the event
         url_log = get_supabase_rest_url(PROMOTION_LOG_TABLE)
@@ -2020,12 +2277,12 @@ def promote_batches():
             'year_back_excluded': len(year_back_rolls),
             'notes': f"Batch promotion executed on {datetime.datetime.now().strftime('%Y-%m-%d')}"
         }
-        requests.post(url_log, headers=SUPABASE_HEADERS, json=log_entry)
+        SESSION.post(url_log, headers=SUPABASE_HEADERS_MIN, json=log_entry)
 
         flash(f"Promotion successful! {results['promoted']} students promoted, {results['to_alumni']} moved to alumni.", "success")
 
     except Exception as e:
-        print(f"Promotion Error: {e}")
+        logger.error("Promotion Error: %s", e)
         flash(f"Error during promotion: {str(e)}", "danger")
 
     return redirect(url_for('admin_batch_promotion_page'))
@@ -2050,7 +2307,7 @@ def add_year_back():
             'current_batch': current_batch,
             'reason': reason
         }
-        resp = requests.post(url, headers=SUPABASE_HEADERS, json=payload, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=payload, timeout=10)
         resp.raise_for_status()
         flash(f"Student {roll_no} added to year-back list.", "success")
     except Exception as e:
@@ -2064,7 +2321,7 @@ def remove_year_back(id):
     try:
         url = get_supabase_rest_url(YEAR_BACK_TABLE)
         params = {'id': f'eq.{id}'}
-        resp = requests.delete(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        resp = SESSION.delete(url, headers=SUPABASE_DELETE_HEADERS, params=params, timeout=10)
         resp.raise_for_status()
         flash("Student removed from year-back list.", "success")
     except Exception as e:
@@ -2094,7 +2351,7 @@ def add_backlog():
             'batch_when_failed': batch,
             'status': 'active'
         }
-        resp = requests.post(url, headers=SUPABASE_HEADERS, json=payload, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=payload, timeout=10)
         resp.raise_for_status()
         flash(f"Backlog added for {roll_no}.", "success")
     except Exception as e:
@@ -2112,7 +2369,7 @@ def clear_backlog(id):
             'status': 'cleared',
             'cleared_date': datetime.datetime.now().isoformat()
         }
-        resp = requests.patch(url, headers=SUPABASE_HEADERS, params=params, json=payload, timeout=10)
+        resp = SESSION.patch(url, params=params, json=payload, timeout=10)
         resp.raise_for_status()
         flash("Backlog marked as cleared.", "success")
     except Exception as e:
@@ -2128,7 +2385,7 @@ def reset_test_data():
         # 1. Fetch from B2, B3, B4
         for source_batch in ["b2", "b3", "b4"]:
             url_source = get_supabase_rest_url(source_batch)
-            resp = requests.get(url_source, headers=SUPABASE_HEADERS, timeout=10)
+            resp = SESSION.get(url_source, timeout=10)
             if not resp.ok: continue
             
             students = resp.json()
@@ -2140,11 +2397,11 @@ def reset_test_data():
                 # Remove ID to allow new primary key generation if necessary, or keep if roll_no is unique
                 # Actually, Supabase identity columns handle this.
                 std.pop('id', None) 
-                requests.post(url_target, headers=SUPABASE_HEADERS, json=std, timeout=10)
+                SESSION.post(url_target, headers=SUPABASE_HEADERS_MIN, json=std, timeout=10)
                 all_moved += 1
             
             # 3. Clear source table
-            requests.delete(url_source, headers=SUPABASE_HEADERS, params={'roll_no': 'neq.0'}, timeout=10)
+            SESSION.delete(url_source, headers=SUPABASE_DELETE_HEADERS, params={'roll_no': 'neq.0'}, timeout=10)
 
         flash(f"Test Reset Complete: {all_moved} students moved back to B1.", "success")
     except Exception as e:
@@ -2155,15 +2412,15 @@ def reset_test_data():
 @login_required(role='admin')
 def admin_result_management_page():
     """Renders the dedicated result announcement management page."""
-    user = session.get('user')
+    user = g.user
     announcements = []
     try:
-        url = f"{SUPABASE_URL}/rest/v1/result_announcements"
-        resp = requests.get(url, headers=SUPABASE_HEADERS, timeout=10)
+        url = get_supabase_rest_url(RESULT_ANNOUNCEMENTS_TABLE)
+        resp = SESSION.get(url, timeout=10)
         if resp.ok:
             announcements = resp.json()
     except Exception as e:
-        print(f"Error fetching announcements: {e}")
+        logger.error("Error fetching announcements: %s", e)
         
     return render_template("result_management.html", user=user, announcements=announcements)
 
@@ -2180,9 +2437,9 @@ def announce_result():
         
     try:
         # Check sequence
-        url = f"{SUPABASE_URL}/rest/v1/result_announcements"
+        url = get_supabase_rest_url(RESULT_ANNOUNCEMENTS_TABLE)
         params = {'batch': f'eq.{batch}'}
-        curr_resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        curr_resp = SESSION.get(url, params=params, timeout=10)
         curr = curr_resp.json()[0] if curr_resp.ok and curr_resp.json() else {}
         
         if status: # Turning ON
@@ -2203,12 +2460,11 @@ def announce_result():
         # 4. Update Announcement
         col = f"{exam_type}_announced"
         payload = {col: status, 'updated_at': datetime.datetime.now().isoformat()}
-        resp = requests.patch(url, headers=SUPABASE_HEADERS, params=params, json=payload, timeout=10)
+        resp = SESSION.patch(url, params=params, json=payload, timeout=10)
         resp.raise_for_status()
 
         # 5. SYNC GRADES
         if status: # Only sync when announcing
-            import threading
             # Run in background to prevent UI hang
             threading.Thread(target=sync_batch_grades, args=(batch, curr.get('current_sem_type', 'odd'))).start()
 
@@ -2228,14 +2484,14 @@ def toggle_semester_type():
         return redirect(url_for('admin_result_management_page'))
         
     try:
-        url = f"{SUPABASE_URL}/rest/v1/result_announcements"
+        url = get_supabase_rest_url(RESULT_ANNOUNCEMENTS_TABLE)
         payload = {'current_sem_type': sem_type, 'updated_at': datetime.datetime.now().isoformat()}
         
         if batch == 'all':
-            requests.patch(url, headers=SUPABASE_HEADERS, params={'batch': 'neq.0'}, json=payload, timeout=10)
+            SESSION.patch(url, params={'batch': 'neq.0'}, json=payload, timeout=10)
             flash(f"ALL batches set to {sem_type.upper()} semester.", "success")
         else:
-            requests.patch(url, headers=SUPABASE_HEADERS, params={'batch': f'eq.{batch}'}, json=payload, timeout=10)
+            SESSION.patch(url, params={'batch': f'eq.{batch}'}, json=payload, timeout=10)
             flash(f"Semester set to {sem_type.upper()} for {batch.upper()}.", "success")
             
     except Exception as e:
@@ -2244,7 +2500,7 @@ def toggle_semester_type():
 
 def sync_batch_grades(batch, sem_type):
     """Optimized batch grade synchronization using dynamic marks tables (marksX vs marksXe)."""
-    print(f"Starting optimized background grade sync for {batch} ({sem_type})...")
+    logger.info("Starting optimized background grade sync for %s (%s)...", batch, sem_type)
     try:
         # 1. Determine semester number and table name
         sem_map = {
@@ -2260,23 +2516,23 @@ def sync_batch_grades(batch, sem_type):
         if sem_type == 'even':
             marks_table += "e"
         
-        print(f"Syncing from table: {marks_table}")
+        logger.info("Syncing from table: %s", marks_table)
         
         # 2. Fetch all students, all marks, and all existing grades
         # Fetch Students
-        std_resp = requests.get(get_supabase_rest_url(batch), headers=SUPABASE_HEADERS, timeout=15)
+        std_resp = SESSION.get(get_supabase_rest_url(batch), timeout=15)
         if not std_resp.ok: return
         students = std_resp.json()
         
         # Fetch ALL Marks for this specific semester table
-        marks_resp = requests.get(f"{SUPABASE_URL}/rest/v1/{marks_table}", headers=SUPABASE_HEADERS, timeout=15)
+        marks_resp = SESSION.get(get_supabase_rest_url(marks_table), timeout=15)
         if not marks_resp.ok: 
-            print(f"Failed to fetch from {marks_table}: {marks_resp.text}")
+            logger.error("Failed to fetch from %s: %s", marks_table, marks_resp.text)
             return
         all_marks_list = marks_resp.json()
         
         # Fetch ALL Existing Grades
-        grades_resp = requests.get(f"{SUPABASE_URL}/rest/v1/{GRADES_TABLE}", headers=SUPABASE_HEADERS, timeout=15)
+        grades_resp = SESSION.get(get_supabase_rest_url(GRADES_TABLE), timeout=15)
         if not grades_resp.ok: return
         all_grades_list = grades_resp.json()
         
@@ -2339,29 +2595,27 @@ def sync_batch_grades(batch, sem_type):
         
         # 5. Batch Upsert to Supabase
         if upsert_payloads:
-            headers = SUPABASE_HEADERS.copy()
-            headers['Prefer'] = 'resolution=merge-duplicates'
-            upsert_resp = requests.post(
-                f"{SUPABASE_URL}/rest/v1/{GRADES_TABLE}", 
-                headers=headers, 
+            upsert_resp = SESSION.post(
+                get_supabase_rest_url(GRADES_TABLE), 
+                headers=SUPABASE_HEADERS_UPSERT, 
                 json=upsert_payloads, 
                 timeout=20
             )
             if not upsert_resp.ok:
-                print(f"Batch upsert failed: {upsert_resp.text}")
+                logger.error("Batch upsert failed: %s", upsert_resp.text)
                 
-        print(f"Optimized grade sync finished for {batch} using {marks_table}. {len(upsert_payloads)} records updated.")
+        logger.info("Optimized grade sync finished for %s using %s. %s records updated.", batch, marks_table, len(upsert_payloads))
     except Exception as e:
-        print(f"Critical error in optimized sync_batch_grades: {e}")
+        logger.exception("Critical error in optimized sync_batch_grades")
 
 def recalculate_cgpa(roll_no):
     """Calculates CGPA across all semesters for a student (Fallback/Manual)."""
     try:
-        url = f"{SUPABASE_URL}/rest/v1/{GRADES_TABLE}"
+        url = get_supabase_rest_url(GRADES_TABLE)
         params = {'roll_no': f'eq.{roll_no}'}
-        resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        resp = SESSION.get(url, params=params, timeout=10)
         if not resp.ok or not resp.json():
-            print(f"No grade record found for {roll_no}")
+            logger.warning("No grade record found for %s", roll_no)
             return
             
         data = resp.json()[0]
@@ -2377,10 +2631,10 @@ def recalculate_cgpa(roll_no):
         
         if total_credits > 0:
             cgpa = round(total_points / total_credits, 2)
-            requests.patch(url, headers=SUPABASE_HEADERS, params=params, json={'cgpa': cgpa}, timeout=10)
+            SESSION.patch(url, params=params, json={'cgpa': cgpa}, timeout=10)
             
     except Exception as e:
-        print(f"Error recalculating CGPA for {roll_no}: {e}")
+        logger.error("Error recalculating CGPA for %s: %s", roll_no, e)
 
 # --- END: BATCH PROMOTION & BACKLOG ROUTES ---
 
@@ -2389,7 +2643,7 @@ def recalculate_cgpa(roll_no):
 @app.route("/student/hostel")
 @login_required(role='student')
 def student_hostel_page():
-    user = session.get('user')
+    user = g.user
     roll_no = user.get('roll_no')
     
     hostel_info = None
@@ -2397,44 +2651,35 @@ def student_hostel_page():
     complaints = []
     gate_passes = []
     
+    # Ensure roll_no is lowercased for the search
+    search_roll = roll_no.lower() if roll_no else ""
+    by_roll = {'roll_no': f'eq.{search_roll}'}
+    newest_first = {**by_roll, 'order': 'created_at.desc'}
+    # Complaints and gate passes only need the roll number, so fetch them alongside the assignment
+    assign_future = SUPABASE_POOL.submit(_lookup_rows, HOSTEL_ASSIGNMENTS_TABLE, by_roll, "by roll_no")
+    complaints_future = SUPABASE_POOL.submit(_lookup_rows, HOSTEL_COMPLAINTS_TABLE, newest_first, "by roll_no")
+    gate_passes_future = SUPABASE_POOL.submit(_lookup_rows, GATE_PASSES_TABLE, newest_first, "by roll_no")
+
     try:
-        # 1. Fetch Student Assignment
-        url_assign = get_supabase_rest_url(HOSTEL_ASSIGNMENTS_TABLE)
-        # Ensure roll_no is lowercased for the search
-        search_roll = roll_no.lower() if roll_no else ""
-        resp_assign = requests.get(url_assign, headers=SUPABASE_HEADERS, params={'roll_no': f'eq.{search_roll}'}, timeout=10)
-        if resp_assign.ok and resp_assign.json():
-            hostel_info = resp_assign.json()[0]
+        # 1. Student Assignment
+        assignments = assign_future.result()
+        if assignments:
+            hostel_info = assignments[0]
             hostel_name = hostel_info['hostel_name']
             
             # 2. Fetch Warden for this hostel
-            url_warden = get_supabase_rest_url(WARDENS_TABLE)
-            resp_warden = requests.get(url_warden, headers=SUPABASE_HEADERS, params={'hostel_name': f'eq.{hostel_name}'}, timeout=10)
-            if resp_warden.ok and resp_warden.json():
-                warden_email = resp_warden.json()[0]['teacher_email']
-                
-                # Fetch warden details from teacher table
-                url_t = get_supabase_rest_url(TEACHER_TABLE)
-                # Select name, email, and phone
-                params_t = {'select': 'teacher_name,teacher_email,teacher_phone', 'teacher_email': f'eq.{warden_email}'}
-                resp_t = requests.get(url_t, headers=SUPABASE_HEADERS, params=params_t, timeout=10)
-                if resp_t.ok and resp_t.json():
-                    warden_info = resp_t.json()[0]
+            wardens = _lookup_rows(WARDENS_TABLE, {'select': 'teacher_email', 'hostel_name': f'eq.{hostel_name}', 'limit': '1'}, "by hostel_name")
+            if wardens:
+                warden_email = wardens[0]['teacher_email']
+                # Warden name, email and phone come from the cached teacher roster
+                warden_info = next((t for t in fetch_all_teachers() if t.get('teacher_email') == warden_email), None)
             
-            # 3. Fetch Student Complaints
-            url_comp = get_supabase_rest_url(HOSTEL_COMPLAINTS_TABLE)
-            resp_comp = requests.get(url_comp, headers=SUPABASE_HEADERS, params={'roll_no': f'eq.{search_roll}', 'order': 'created_at.desc'}, timeout=10)
-            if resp_comp.ok:
-                complaints = resp_comp.json()
-
-            # 4. Fetch Student Gate Passes
-            url_gp = get_supabase_rest_url(GATE_PASSES_TABLE)
-            resp_gp = requests.get(url_gp, headers=SUPABASE_HEADERS, params={'roll_no': f'eq.{search_roll}', 'order': 'created_at.desc'}, timeout=10)
-            if resp_gp.ok:
-                gate_passes = resp_gp.json()
+            # 3. Student Complaints, 4. Student Gate Passes
+            complaints = complaints_future.result()
+            gate_passes = gate_passes_future.result()
                 
     except Exception as e:
-        print(f"Error fetching hostel info: {e}")
+        logger.error("Error fetching hostel info: %s", e)
         flash("Could not load hostel information.", "warning")
 
     return render_template("hostel_student.html", user=user, hostel=hostel_info, warden=warden_info, complaints=complaints, gate_passes=gate_passes)
@@ -2442,7 +2687,7 @@ def student_hostel_page():
 @app.route("/student/hostel/complain", methods=["POST"])
 @login_required(role='student')
 def submit_hostel_complaint():
-    user = session.get('user')
+    user = g.user
     roll_no = user.get('roll_no')
     message = request.form.get('message', '').strip()
     hostel_name = request.form.get('hostel_name')
@@ -2459,7 +2704,7 @@ def submit_hostel_complaint():
             'message': message,
             'status': 'pending'
         }
-        resp = requests.post(url, headers=SUPABASE_HEADERS, json=payload, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=payload, timeout=10)
         resp.raise_for_status()
         flash("Complaint submitted successfully to your warden.", "success")
     except Exception as e:
@@ -2470,7 +2715,7 @@ def submit_hostel_complaint():
 @app.route("/student/hostel/gate-pass", methods=["POST"])
 @login_required(role='student')
 def request_gate_pass():
-    user = session.get('user')
+    user = g.user
     roll_no = user.get('roll_no')
     hostel_name = request.form.get('hostel_name')
     reason = request.form.get('reason', '').strip()
@@ -2495,7 +2740,7 @@ def request_gate_pass():
             'in_time': in_time if in_time else None,
             'status': 'pending'
         }
-        resp = requests.post(url, headers=SUPABASE_HEADERS, json=payload, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=payload, timeout=10)
         resp.raise_for_status()
         flash("Gate pass request submitted successfully.", "success")
     except Exception as e:
@@ -2506,7 +2751,7 @@ def request_gate_pass():
 @app.route("/teacher/warden/gate-pass/approve/<int:id>", methods=["POST"])
 @login_required(role='teacher')
 def approve_gate_pass(id):
-    user = session.get('user')
+    user = g.user
     teacher_email = user.get('teacher_email')
     status = request.form.get('status', 'approved') # approved or rejected
 
@@ -2518,7 +2763,7 @@ def approve_gate_pass(id):
             'approved_by': teacher_email,
             'approved_at': datetime.datetime.now().isoformat()
         }
-        resp = requests.patch(url, headers=SUPABASE_HEADERS, params=params, json=payload, timeout=10)
+        resp = SESSION.patch(url, params=params, json=payload, timeout=10)
         resp.raise_for_status()
         flash(f"Gate pass {status} successfully.", "success")
     except Exception as e:
@@ -2528,13 +2773,13 @@ def approve_gate_pass(id):
 @app.route("/student/hostel/gate-pass/print/<int:id>")
 @login_required(role='student')
 def print_gate_pass(id):
-    user = session.get('user')
+    user = g.user
     roll_no = user.get('roll_no').lower()
 
     try:
         url = get_supabase_rest_url(GATE_PASSES_TABLE)
         params = {'id': f'eq.{id}', 'roll_no': f'eq.{roll_no}'}
-        resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        resp = SESSION.get(url, params=params, timeout=10)
         if resp.ok and resp.json():
             gate_pass = resp.json()[0]
             if gate_pass['status'] != 'approved':
@@ -2545,8 +2790,8 @@ def print_gate_pass(id):
             warden_email = gate_pass['approved_by']
             warden_name = "Warden"
             if warden_email:
-                url_t = get_supabase_rest_url(TEACHER_TABLE)
-                resp_t = requests.get(url_t, headers=SUPABASE_HEADERS, params={'teacher_email': f'eq.{warden_email}', 'select': 'teacher_name'}, timeout=5)
+                url_t = TEACHER_URL
+                resp_t = SESSION.get(url_t, params={'teacher_email': f'eq.{warden_email}', 'select': 'teacher_name'}, timeout=5)
                 if resp_t.ok and resp_t.json():
                     warden_name = resp_t.json()[0]['teacher_name']
 
@@ -2561,20 +2806,20 @@ def print_gate_pass(id):
 @app.route("/teacher/warden")
 @login_required(role='teacher')
 def warden_dashboard():
-    user = session.get('user')
+    user = g.user
     teacher_email = user.get('teacher_email')
     
     # Re-verify warden status to ensure session is up to date
     hostel_name = None
     try:
         url_w = get_supabase_rest_url(WARDENS_TABLE)
-        resp_w = requests.get(url_w, headers=SUPABASE_HEADERS, params={'teacher_email': f'eq.{teacher_email}'}, timeout=5)
+        resp_w = SESSION.get(url_w, params={'teacher_email': f'eq.{teacher_email}'}, timeout=5)
         if resp_w.ok and resp_w.json():
             hostel_name = resp_w.json()[0].get('hostel_name')
             session['user']['is_warden'] = True
             session['user']['hostel_name'] = hostel_name
     except Exception as e:
-        print(f"Error verifying warden status: {e}")
+        logger.error("Error verifying warden status: %s", e)
 
     if not hostel_name:
         flash("Access Denied: You are not assigned as a warden for any hostel.", "danger")
@@ -2587,37 +2832,37 @@ def warden_dashboard():
     try:
         # 1. Fetch Residents
         url_res = get_supabase_rest_url(HOSTEL_ASSIGNMENTS_TABLE)
-        resp_res = requests.get(url_res, headers=SUPABASE_HEADERS, params={'hostel_name': f'eq.{hostel_name}'}, timeout=10)
+        resp_res = SESSION.get(url_res, params={'hostel_name': f'eq.{hostel_name}'}, timeout=10)
         if resp_res.ok:
             residents = resp_res.json()
             
         # 2. Fetch Complaints
         url_comp = get_supabase_rest_url(HOSTEL_COMPLAINTS_TABLE)
-        resp_comp = requests.get(url_comp, headers=SUPABASE_HEADERS, params={'hostel_name': f'eq.{hostel_name}', 'order': 'created_at.desc'}, timeout=10)
+        resp_comp = SESSION.get(url_comp, params={'hostel_name': f'eq.{hostel_name}', 'order': 'created_at.desc'}, timeout=10)
         if resp_comp.ok:
             complaints = resp_comp.json()
 
         # 3. Fetch Gate Passes
         url_gp = get_supabase_rest_url(GATE_PASSES_TABLE)
-        resp_gp = requests.get(url_gp, headers=SUPABASE_HEADERS, params={'hostel_name': f'eq.{hostel_name}', 'order': 'created_at.desc'}, timeout=10)
+        resp_gp = SESSION.get(url_gp, params={'hostel_name': f'eq.{hostel_name}', 'order': 'created_at.desc'}, timeout=10)
         if resp_gp.ok:
             gate_passes = resp_gp.json()
     except Exception as e:
-        print(f"Error loading warden data: {e}")
+        logger.error("Error loading warden data: %s", e)
 
     # Fetch all students for the searchable assignment dropdown
     all_students = []
     try:
         for batch in STUDENT_TABLES:
             url_s = get_supabase_rest_url(batch)
-            resp_s = requests.get(url_s, headers=SUPABASE_HEADERS, params={'select': 'roll_no,student_name'}, timeout=10)
+            resp_s = SESSION.get(url_s, params={'select': 'roll_no,student_name'}, timeout=10)
             if resp_s.ok:
                 batch_students = resp_s.json()
                 for s in batch_students:
                     s['display'] = f"{s['student_name']} ({s['roll_no'].upper()}) - {batch.upper()}"
                 all_students.extend(batch_students)
     except Exception as e:
-        print(f"Error fetching students for warden: {e}")
+        logger.error("Error fetching students for warden: %s", e)
 
     return render_template("warden_dashboard.html", 
                            user=user, 
@@ -2625,9 +2870,7 @@ def warden_dashboard():
                            complaints=complaints, 
                            gate_passes=gate_passes,
                            hostel_name=hostel_name,
-                           all_students=all_students,
-                           supabase_url=SUPABASE_URL,
-                           supabase_key=SUPABASE_ANON_KEY)
+                           all_students=all_students)
 
 @app.route("/teacher/warden/complaint/seen/<int:id>", methods=["POST"])
 @login_required(role='teacher')
@@ -2636,7 +2879,7 @@ def mark_complaint_seen(id):
         url = get_supabase_rest_url(HOSTEL_COMPLAINTS_TABLE)
         params = {'id': f'eq.{id}'}
         payload = {'status': 'seen'}
-        resp = requests.patch(url, headers=SUPABASE_HEADERS, params=params, json=payload, timeout=10)
+        resp = SESSION.patch(url, params=params, json=payload, timeout=10)
         resp.raise_for_status()
         flash("Complaint marked as seen.", "success")
     except Exception as e:
@@ -2651,38 +2894,32 @@ def admin_hostel_management():
     all_teachers = []
     all_students = []
     try:
-        # Fetch teachers
-        url_t = get_supabase_rest_url(TEACHER_TABLE)
-        resp_t = requests.get(url_t, headers=SUPABASE_HEADERS, params={'select': 'teacher_name,teacher_email', 'order': 'teacher_name.asc'}, timeout=10)
-        if resp_t.ok:
-            all_teachers = resp_t.json()
+        # Teachers come from the cached roster (already ordered by teacher_name)
+        all_teachers = fetch_all_teachers()
 
-        # Fetch all students from all batches
-        for batch in STUDENT_TABLES:
-            url_s = get_supabase_rest_url(batch)
-            resp_s = requests.get(url_s, headers=SUPABASE_HEADERS, params={'select': 'roll_no,student_name'}, timeout=10)
-            if resp_s.ok:
-                batch_students = resp_s.json()
-                # Add batch info to help identify students
-                for s in batch_students:
-                    s['display'] = f"{s['student_name']} ({s['roll_no'].upper()}) - {batch.upper()}"
-                all_students.extend(batch_students)
+        # Fetch all students from all batches (one request per batch, issued together)
+        params_s = {'select': 'roll_no,student_name'}
+        futures = [(batch, SUPABASE_POOL.submit(_lookup_rows, batch, params_s, "for hostel admin")) for batch in STUDENT_TABLES]
+        for batch, future in futures:
+            batch_students = future.result()
+            # Add batch info to help identify students
+            for s in batch_students:
+                s['display'] = f"{s['student_name']} ({s['roll_no'].upper()}) - {batch.upper()}"
+            all_students.extend(batch_students)
 
     except Exception as e:
-        print(f"Error fetching data for hostel admin: {e}")
+        logger.error("Error fetching data for hostel admin: %s", e)
 
     return render_template("admin_hostel.html", 
                            teachers=all_teachers,
-                           all_students=all_students,
-                           supabase_url=SUPABASE_URL, 
-                           supabase_key=SUPABASE_ANON_KEY)
+                           all_students=all_students)
 
 # --- HOD PORTAL ROUTES ---
 
 @app.route("/hod/dashboard")
 @login_required(role='teacher')
 def hod_dashboard():
-    user = session.get('user')
+    user = g.user
     if not user.get('is_hod'):
         flash("Access Denied: You are not assigned as HOD.", "danger")
         return redirect(url_for('index'))
@@ -2693,7 +2930,7 @@ def hod_dashboard():
 @app.route("/hod/manage-marks")
 @login_required(role='teacher')
 def hod_manage_marks():
-    user = session.get('user')
+    user = g.user
     if not user.get('is_hod'):
         flash("Access Denied.", "danger")
         return redirect(url_for('index'))
@@ -2705,16 +2942,13 @@ def hod_manage_marks():
         "hod_marks.html",
         user=user,
         department=dept,
-        all_teachers_json=json.dumps(all_teachers),
-        marks_tables_json=json.dumps(MARKS_TABLES),
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY
+        all_teachers_json=to_json(all_teachers)
     )
 
 @app.route("/hod/manage-attendance")
 @login_required(role='teacher')
 def hod_manage_attendance():
-    user = session.get('user')
+    user = g.user
     if not user.get('is_hod'):
         flash("Access Denied.", "danger")
         return redirect(url_for('index'))
@@ -2726,16 +2960,13 @@ def hod_manage_attendance():
         "hod_attendance.html",
         user=user,
         department=dept,
-        all_teachers_json=json.dumps(all_teachers),
-        attendance_tables_json=json.dumps(ATTENDANCE_TABLES),
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY
+        all_teachers_json=to_json(all_teachers)
     )
 
 @app.route("/hod/assign-subject")
 @login_required(role='teacher')
 def hod_assign_subject():
-    user = session.get('user')
+    user = g.user
     if not user.get('is_hod'):
         flash("Access Denied.", "danger")
         return redirect(url_for('index'))
@@ -2747,23 +2978,43 @@ def hod_assign_subject():
         "hod_assign_subject.html",
         user=user,
         department=dept,
-        all_teachers=all_teachers,
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_ANON_KEY
+        all_teachers=all_teachers
     )
 
 # --- MOBILE API ROUTES ---
 
+# Successful API logins only (failures are never cached, so every wrong guess still costs a
+# full lookup + rate-limit hit). Keyed by an HMAC of the credentials, never the password itself.
+_AUTH_CACHE = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+_AUTH_CACHE_LOCK = threading.Lock()
+
+def _cached_login(username, password):
+    key = hmac.new(SECRET_KEY.encode(), f"{username.lower()}\x00{password}".encode(), hashlib.sha256).digest()
+    with _AUTH_CACHE_LOCK:
+        user_data = _AUTH_CACHE.get(key)
+    if user_data is None:
+        user_data = fetch_and_verify_user(username, password)
+        if user_data:
+            with _AUTH_CACHE_LOCK:
+                _AUTH_CACHE[key] = user_data
+    return user_data
+
+# Failure bodies never change, so encode them once (the 401 branch is what credential stuffing hits)
+_LOGIN_MISSING_BODY = orjson.dumps({"message": "Username and password required"})
+_LOGIN_INVALID_BODY = orjson.dumps({"message": "Invalid credentials"})
+_RATE_LIMITED_BODY = orjson.dumps({"message": "Too many login attempts. Please wait a minute and try again."})
+
 @app.route("/api/login", methods=["POST"])
+@limiter.limit(API_LOGIN_RATE_LIMIT) # Checked before any Supabase lookup or password hashing
 def api_login():
     data = request.json
     username = data.get("username")
     password = data.get("password")
     
     if not username or not password:
-        return jsonify({"message": "Username and password required"}), 400
+        return app.response_class(_LOGIN_MISSING_BODY, status=400, mimetype="application/json")
         
-    user_data = fetch_and_verify_user(username, password)
+    user_data = _cached_login(username, password)
     if user_data:
         # For mobile, we just return the user data. In a real app, use JWT.
         return jsonify({
@@ -2772,7 +3023,7 @@ def api_login():
             "user": user_data
         })
     else:
-        return jsonify({"message": "Invalid credentials"}), 401
+        return app.response_class(_LOGIN_INVALID_BODY, status=401, mimetype="application/json")
 
 @app.route("/api/dashboard", methods=["POST"])
 def api_dashboard():
@@ -2785,28 +3036,25 @@ def api_dashboard():
     daily_schedule = []
     today_is_holiday = False
     
-    IST = ZoneInfo("Asia/Kolkata")
-    today = datetime.datetime.now(IST) 
-    today_date_str = today.strftime('%Y-%m-%d')
-    today_str = today.strftime('%a').upper()
+    today = datetime.datetime.now(_IST) 
+    today_date_str = today.date().isoformat()
+    today_str = _WEEKDAY[today.weekday()]
     
     try:
         # Fetch Events
         url_events = get_supabase_rest_url(EVENTS_TABLE)
         params_events = {'select': '*', 'date': f'gte.{today_date_str}', 'order': 'date.asc', 'limit': 5}
-        resp_events = requests.get(url_events, headers=SUPABASE_HEADERS, params=params_events, timeout=5)
+        resp_events = SESSION.get(url_events, params=params_events, timeout=5)
         if resp_events.ok: events_data = resp_events.json()
 
         # Fetch Holidays
         url_holidays = get_supabase_rest_url(HOLIDAYS_TABLE)
         params_holidays = {'select': '*', 'date': f'gte.{today_date_str}', 'order': 'date.asc'}
-        resp_holidays = requests.get(url_holidays, headers=SUPABASE_HEADERS, params=params_holidays, timeout=5)
+        resp_holidays = SESSION.get(url_holidays, params=params_holidays, timeout=5)
         if resp_holidays.ok:
             holidays_data = resp_holidays.json()
-            for h in holidays_data:
-                if h.get('date') == today_date_str:
-                    today_is_holiday = True
-                    break
+            # Ordered by date from today onwards, so only the first row can be today
+            today_is_holiday = bool(holidays_data) and holidays_data[0].get('date') == today_date_str
 
         # Schedule
         if role == 'student':
@@ -2814,14 +3062,14 @@ def api_dashboard():
             current_month = today.month
             current_semester = get_current_semester(batch, current_month)
             if current_semester:
-                url_tt = get_supabase_rest_url(TIMETABLE_TABLE)
+                url_tt = TIMETABLE_URL
                 params_tt = {
                     'select': 'start_time,end_time,venue,courses(course_name,course_code)',
                     'semester': f'eq.{current_semester}',
                     'day_of_week': f'eq.{today_str}',
                     'order': 'start_time.asc'
                 }
-                resp_tt = requests.get(url_tt, headers=SUPABASE_HEADERS, params=params_tt, timeout=5)
+                resp_tt = SESSION.get(url_tt, params=params_tt, timeout=5)
                 if resp_tt.ok:
                     for entry in resp_tt.json():
                         course = entry.get('courses')
@@ -2829,14 +3077,14 @@ def api_dashboard():
                         daily_schedule.append(f"{entry['start_time']} - {entry['end_time']} : {course_details} ({entry.get('venue', 'N/A')})")
         elif role == 'teacher':
             # For teacher, fetch courses they assist in
-            url_c = get_supabase_rest_url(COURSE_TABLE)
+            url_c = COURSE_URL
             params_c = {'select': 'course_name,course_code,semester', 'assisting_teacher': f"eq.{user.get('username')}"}
-            resp_c = requests.get(url_c, headers=SUPABASE_HEADERS, params=params_c, timeout=5)
+            resp_c = SESSION.get(url_c, params=params_c, timeout=5)
             if resp_c.ok:
                 assigned_courses = resp_c.json()
                 codes = [c['course_code'] for c in assigned_courses]
                 if codes:
-                    url_tt = get_supabase_rest_url(TIMETABLE_TABLE)
+                    url_tt = TIMETABLE_URL
                     # Filter by today and their subjects
                     params_tt = {
                         'select': 'start_time,end_time,venue,subject_code',
@@ -2844,13 +3092,13 @@ def api_dashboard():
                         'subject_code': f'in.({",".join(codes)})',
                         'order': 'start_time.asc'
                     }
-                    resp_tt = requests.get(url_tt, headers=SUPABASE_HEADERS, params=params_tt, timeout=5)
+                    resp_tt = SESSION.get(url_tt, params=params_tt, timeout=5)
                     if resp_tt.ok:
                         for entry in resp_tt.json():
                             daily_schedule.append(f"{entry['start_time']} - {entry['end_time']} : {entry['subject_code']} ({entry.get('venue', 'N/A')})")
 
     except Exception as e:
-        print(f"API Dashboard error: {e}")
+        logger.error("API Dashboard error: %s", e)
 
     return jsonify({
         "events": [Event(None, e['date'], e['description']).__dict__ for e in events_data],
@@ -2868,14 +3116,14 @@ def api_teacher_courses():
     fetch_all = data.get("all") == "true"
     
     try:
-        url = get_supabase_rest_url(COURSE_TABLE)
-        if fetch_all:
-            params = {'select': 'course_code,course_name,semester,credits'}
-        else:
+        if not fetch_all:
             if not username: return jsonify([]), 400
-            params = {'select': 'course_code,course_name,semester,credits', 'assisting_teacher': f'eq.{username}'}
-            
-        resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+            try:
+                return jsonify(_courses_for_teacher(username))
+            except requests.exceptions.HTTPError:
+                return jsonify([])
+        params = {'select': 'course_code,course_name,semester,credits'}
+        resp = SESSION.get(COURSE_URL, params=params, timeout=10)
         return jsonify(resp.json() if resp.ok else [])
     except: return jsonify([]), 500
 
@@ -2887,7 +3135,7 @@ def api_teacher_students():
     try:
         url = get_supabase_rest_url(batch)
         params = {'select': 'roll_no,student_name', 'order': 'roll_no.asc'}
-        resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        resp = SESSION.get(url, params=params, timeout=10)
         return jsonify(resp.json() if resp.ok else [])
     except: return jsonify([]), 500
 
@@ -2902,9 +3150,7 @@ def api_save_attendance():
     
     try:
         url = get_supabase_rest_url(att_table)
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'return=minimal'
-        resp = requests.post(url, headers=headers, json=records, timeout=15)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=records, timeout=15)
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -2919,9 +3165,7 @@ def api_save_marks():
     
     try:
         url = get_supabase_rest_url(marks_table)
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'resolution=merge-duplicates' # Upsert
-        resp = requests.post(url, headers=headers, json=marks_data, timeout=15)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_UPSERT, json=marks_data, timeout=15)
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -2953,10 +3197,12 @@ def api_hod_assign_subject():
         return jsonify({"success": False, "message": "Missing data"}), 400
         
     try:
-        url = get_supabase_rest_url(COURSE_TABLE)
+        url = COURSE_URL
         params = {'course_code': f'eq.{course_code}'}
         payload = {'assisting_teacher': teacher_username}
-        resp = requests.patch(url, headers=SUPABASE_HEADERS, params=params, json=payload, timeout=10)
+        resp = SESSION.patch(url, params=params, json=payload, timeout=10)
+        if resp.ok:
+            _invalidate_courses()
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -2965,14 +3211,16 @@ def api_hod_assign_subject():
 @app.route("/api/events/add", methods=["POST"])
 @login_required()
 def api_add_event():
-    user = session.get('user')
-    if not (user.get('role') == 'admin' or (user.get('role') == 'teacher' and user.get('is_hod'))):
+    user = g.user
+    if not (g.role == 'admin' or (g.role == 'teacher' and user.get('is_hod'))):
         return jsonify({"success": False, "message": "Access denied"}), 403
     data = request.json
     # {date, description}
     try:
         url = get_supabase_rest_url(EVENTS_TABLE)
-        resp = requests.post(url, headers=SUPABASE_HEADERS, json=data, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=data, timeout=10)
+        if resp.ok:
+            _invalidate_upcoming()
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -2982,7 +3230,9 @@ def api_add_holiday():
     # {date, description}
     try:
         url = get_supabase_rest_url(HOLIDAYS_TABLE)
-        resp = requests.post(url, headers=SUPABASE_HEADERS, json=data, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=data, timeout=10)
+        if resp.ok:
+            _invalidate_upcoming()
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -2994,9 +3244,7 @@ def api_warden_assign_room():
     # {roll_no, hostel_name, room_number}
     try:
         url = get_supabase_rest_url(HOSTEL_ASSIGNMENTS_TABLE)
-        headers = SUPABASE_HEADERS.copy()
-        headers['Prefer'] = 'resolution=merge-duplicates' # Upsert
-        resp = requests.post(url, headers=headers, json=data, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_UPSERT, json=data, timeout=10)
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -3012,7 +3260,7 @@ def api_warden_search_student():
             url = get_supabase_rest_url(batch)
             # Search by roll_no or name
             params = {'or': f'(roll_no.ilike.*{query}*,student_name.ilike.*{query}*)', 'limit': 10}
-            resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+            resp = SESSION.get(url, params=params, timeout=10)
             if resp.ok:
                 for s in resp.json():
                     s['batch'] = batch
@@ -3026,7 +3274,7 @@ def api_send_notification():
     # {sender_username, sender_name, message, target_batch, target_department}
     try:
         url = get_supabase_rest_url(NOTIFICATIONS_TABLE)
-        resp = requests.post(url, headers=SUPABASE_HEADERS, json=data, timeout=10)
+        resp = SESSION.post(url, headers=SUPABASE_HEADERS_MIN, json=data, timeout=10)
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -3040,7 +3288,7 @@ def api_warden_gatepasses():
     try:
         url = get_supabase_rest_url(GATE_PASSES_TABLE)
         params = {'hostel_name': f'eq.{hostel_name}', 'status': 'eq.pending', 'order': 'created_at.desc'}
-        resp = requests.get(url, headers=SUPABASE_HEADERS, params=params, timeout=10)
+        resp = SESSION.get(url, params=params, timeout=10)
         return jsonify(resp.json() if resp.ok else [])
     except: return jsonify([]), 500
 
@@ -3061,7 +3309,7 @@ def api_update_gatepass():
             'approved_by': teacher_email,
             'approved_at': datetime.datetime.now().isoformat()
         }
-        resp = requests.patch(url, headers=SUPABASE_HEADERS, params=params, json=payload, timeout=10)
+        resp = SESSION.patch(url, params=params, json=payload, timeout=10)
         return jsonify({"success": resp.ok})
     except: return jsonify({"success": False}), 500
 
@@ -3070,22 +3318,31 @@ def api_update_gatepass():
 @app.route('/ai-helper')
 @login_required()
 def ai_helper_page():
-    return render_template('chatbot_page.html', user=session.get('user'))
+    return render_template('chatbot_page.html', user=g.user)
 
 # --- Error Handling ---
 @app.errorhandler(404)
 def page_not_found(e):
-    print(f"404 Error: {e}")
+    logger.warning("404 Error: %s", e)
     return render_template('404.html'), 404
 
+@app.errorhandler(429)
+def too_many_requests(e):
+    logger.warning("429 Rate limit: %s", e)
+    if request.path.startswith('/api/'):
+        return app.response_class(_RATE_LIMITED_BODY, status=429, mimetype="application/json")
+    flash("Too many login attempts. Please wait a minute and try again.", "danger")
+    return render_template('login.html'), 429
+
 @app.errorhandler(500)
 def internal_server_error(e):
-    print(f"Internal Server Error: {e}")
+    logger.error("Internal Server Error: %s", e, exc_info=getattr(e, 'original_exception', None))
     return render_template('500.html'), 500
 
 # --- Main Execution ---
+# Development only. Production: gunicorn wsgi:app (settings in gunicorn.conf.py), or python wsgi.py
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=FLASK_DEBUG, host='0.0.0.0', port=PORT)
 
 
 
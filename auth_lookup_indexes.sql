@@ -0,0 +1,49 @@
+-- Login lookups: indexes + lower-case normalization
+-- login_lookup (login_lookup.sql) compares the lower-cased username with plain
+-- equality: b1-b4 roll_no / student_email / parent_email, teachers.username and
+-- admin.username, plus wardens.teacher_email for the warden flag. Those equality
+-- checks can use plain B-tree indexes as long as the stored values are lower-case
+-- too, so this normalizes on write instead of adding lower(...) expression
+-- indexes that the RPC's queries would never match.
+-- b1-b4 are already covered by the UNIQUE indexes in signup_unique_migration.sql.
+
+CREATE INDEX IF NOT EXISTS idx_teachers_username ON "teachers"("username");
+CREATE INDEX IF NOT EXISTS idx_admin_username ON "admin"("username");
+CREATE INDEX IF NOT EXISTS idx_wardens_teacher_email ON "wardens"("teacher_email");
+
+-- Lower-case the login columns on every insert/update
+CREATE OR REPLACE FUNCTION normalize_student_login() RETURNS TRIGGER AS $$
+BEGIN
+    NEW."roll_no" := lower(NEW."roll_no");
+    NEW."student_email" := lower(NEW."student_email");
+    NEW."parent_email" := lower(NEW."parent_email");
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION normalize_username() RETURNS TRIGGER AS $$
+BEGIN
+    NEW."username" := lower(NEW."username");
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS b1_normalize_login ON "b1";
+CREATE TRIGGER b1_normalize_login BEFORE INSERT OR UPDATE ON "b1" FOR EACH ROW EXECUTE FUNCTION normalize_student_login();
+DROP TRIGGER IF EXISTS b2_normalize_login ON "b2";
+CREATE TRIGGER b2_normalize_login BEFORE INSERT OR UPDATE ON "b2" FOR EACH ROW EXECUTE FUNCTION normalize_student_login();
+DROP TRIGGER IF EXISTS b3_normalize_login ON "b3";
+CREATE TRIGGER b3_normalize_login BEFORE INSERT OR UPDATE ON "b3" FOR EACH ROW EXECUTE FUNCTION normalize_student_login();
+DROP TRIGGER IF EXISTS b4_normalize_login ON "b4";
+CREATE TRIGGER b4_normalize_login BEFORE INSERT OR UPDATE ON "b4" FOR EACH ROW EXECUTE FUNCTION normalize_student_login();
+DROP TRIGGER IF EXISTS teachers_normalize_username ON "teachers";
+CREATE TRIGGER teachers_normalize_username BEFORE INSERT OR UPDATE ON "teachers" FOR EACH ROW EXECUTE FUNCTION normalize_username();
+DROP TRIGGER IF EXISTS admin_normalize_username ON "admin";
+CREATE TRIGGER admin_normalize_username BEFORE INSERT OR UPDATE ON "admin" FOR EACH ROW EXECUTE FUNCTION normalize_username();
+
+-- Existing mixed-case rows can't log in today (login always sends lower case).
+-- To fix them, normalize once. courses.assisting_teacher stores teacher usernames, so update it too:
+-- UPDATE "b1" SET "roll_no" = "roll_no"; -- (repeat for b2-b4; the trigger lower-cases on UPDATE)
+-- UPDATE "courses" SET "assisting_teacher" = lower("assisting_teacher") WHERE "assisting_teacher" <> lower("assisting_teacher");
+-- UPDATE "teachers" SET "username" = "username";
+-- UPDATE "admin" SET "username" = "username";
@@ -21,6 +21,7 @@ ADMIN_TABLE = "admin" # Assumed table name for administrators
 COURSE_TABLE = "courses"
 GRADES_TABLE = "grades"
 BACKLOG_TABLE = "backlogs"
+RESULT_ANNOUNCEMENTS_TABLE = "result_announcements"
 MARKS_TABLES = ["marks1", "marks2", "marks3", "marks4"]
 EVEN_MARKS_TABLES = ["marks1e", "marks2e", "marks3e", "marks4e"]
 ATTENDANCE_TABLES = ["attendance1", "attendance2", "attendance3", "attendance4"] # For batch-specific attendance
@@ -30,6 +31,7 @@ ATTENDANCE_TABLE = "attendance" # General/old table, keep for reference or other
 EVENTS_TABLE = "events"
 HOLIDAYS_TABLE = "holidays"
 TIMETABLE_TABLE = "timetables"
+DASHBOARD_UPCOMING_TABLE = "dashboard_upcoming" # Materialized view: events + holidays (see dashboard_upcoming.sql)
 
 # --- Batch Promotion Tables ---
 PROMOTION_LOG_TABLE = "promotion_log"
@@ -46,6 +48,39 @@ HOSTEL_ASSIGNMENTS_TABLE = "hostel_assignments"
 HOSTEL_COMPLAINTS_TABLE = "hostel_complaints"
 GATE_PASSES_TABLE = "gate_passes"
 
+# --- Password Hashing (argon2id) ---
+# Used for all NEW hashes. Legacy bcrypt / Werkzeug PBKDF2 hashes are still
+# accepted at login and re-hashed with these parameters on the next success.
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", 65536)) # KiB (64 MiB)
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", 1))
+
+# --- Concurrency ---
+# Worker threads for fanning out independent Supabase lookups (e.g. login searches all user tables at once)
+SUPABASE_POOL_WORKERS = int(os.environ.get("SUPABASE_POOL_WORKERS", 16))
+# Worker threads for password verification (CPU bound, so keep this near the core count)
+PWD_POOL_WORKERS = int(os.environ.get("PWD_POOL_WORKERS", 4))
+# Keep-alive sockets to Supabase per worker process. Under gevent every greenlet may hold one,
+# so match GUNICORN_WORKER_CONNECTIONS; extra requests wait for a free socket instead of opening more.
+SUPABASE_HTTP_POOL_SIZE = int(os.environ.get("SUPABASE_HTTP_POOL_SIZE", 200))
+# Seconds each login lookup may wait on Supabase before the login fails fast (other routes use 10)
+LOGIN_LOOKUP_TIMEOUT = float(os.environ.get("LOGIN_LOOKUP_TIMEOUT", 5))
+
+# --- Rate Limiting (flask-limiter) ---
+LOGIN_RATE_LIMIT = os.environ.get("LOGIN_RATE_LIMIT", "10 per minute") # Per client IP, POST /login only
+API_LOGIN_RATE_LIMIT = os.environ.get("API_LOGIN_RATE_LIMIT", "10 per minute; 100 per hour") # Per client IP, POST /api/login (mobile)
+# memory:// is per worker process; point this at Redis (redis://host:6379) to share limits across workers
+RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", "memory://")
+
+# --- Login result cache ---
+# Successful /api/login results are reused for this many seconds (mobile retries, refreshes).
+# A password change takes effect for that client at most this long after it is made.
+AUTH_CACHE_TTL = int(os.environ.get("AUTH_CACHE_TTL", 30))
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", 2000))
+
+# --- Admin list pages ---
+ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", 25)) # Rows per page on the course/teacher management tables
+
 # --- Headers for Supabase REST API calls ---
 # Using Anon key - ensure RLS is properly configured if using this.
 SUPABASE_HEADERS = {
@@ -55,6 +90,11 @@ SUPABASE_HEADERS = {
     "Prefer": "return=representation", # Optional: Returns the inserted/updated data
 }
 
+# Variants built once at import (pass as headers= instead of copying SUPABASE_HEADERS per call)
+SUPABASE_HEADERS_MIN = {**SUPABASE_HEADERS, "Prefer": "return=minimal"} # Writes whose response body is not needed
+SUPABASE_HEADERS_UPSERT = {**SUPABASE_HEADERS, "Prefer": "resolution=merge-duplicates"} # Upsert on the primary/unique key
+SUPABASE_DELETE_HEADERS = SUPABASE_HEADERS_MIN # Deletes never need the removed rows sent back
+
 # Alternatively, using Service Key (bypasses RLS, use with caution)
 # SUPABASE_SERVICE_HEADERS = {
 #     "apikey": SUPABASE_SERVICE_KEY,
@@ -65,3 +105,15 @@ SUPABASE_HEADERS = {
 
 # --- Flask App Configuration ---
 SECRET_KEY = os.environ.get("SECRET_KEY", "your_very_secret_flask_key_change_this") # Change this for production! Use a strong, random key.
+# Development server only (python app.py). Production runs under Gunicorn + gevent, see README.
+FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "0") == "1"
+PORT = int(os.environ.get("PORT", 5000))
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper() # DEBUG, INFO, WARNING, ERROR
+
+# --- Production Server (Gunicorn + gevent, see gunicorn.conf.py) ---
+# Sizing: each worker is one process serving up to WORKER_CONNECTIONS greenlets, each holding at
+# most one Supabase socket. Keep WORKERS * SUPABASE_HTTP_POOL_SIZE within what your Supabase
+# plan's API gateway / pooler accepts concurrently, and WORKERS near the CPU count (argon2 is CPU bound).
+GUNICORN_WORKERS = int(os.environ.get("GUNICORN_WORKERS", 4))
+GUNICORN_WORKER_CONNECTIONS = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+GUNICORN_TIMEOUT = int(os.environ.get("GUNICORN_TIMEOUT", 30)) # Seconds before a stuck worker is restarted
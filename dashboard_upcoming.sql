@@ -0,0 +1,47 @@
+-- Dashboard: upcoming events + holidays in a single relation
+-- The dashboard used to issue two queries (events, holidays) with the same
+-- `date >= today ORDER BY date` filter. This materialized view tags each row
+-- with its `kind` so index() can load both lists with one request.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS "dashboard_upcoming" AS
+SELECT 'event'::TEXT AS "kind", "id", "name", "date", "time", "description"
+FROM "events"
+WHERE "date" >= CURRENT_DATE - 1
+UNION ALL
+SELECT 'holiday'::TEXT AS "kind", "id", "name", "date", NULL::TIME AS "time", NULL::TEXT AS "description"
+FROM "holidays"
+WHERE "date" >= CURRENT_DATE - 1;
+
+-- A UNIQUE index is required for REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_dashboard_upcoming_kind_id ON "dashboard_upcoming"("kind", "id");
+CREATE INDEX IF NOT EXISTS idx_dashboard_upcoming_date ON "dashboard_upcoming"("date");
+
+-- Keep the view in sync with writes to either base table.
+-- SECURITY DEFINER so any role that may write events/holidays can refresh the view
+-- (REFRESH requires ownership); the fixed search_path stops the caller's from being used.
+CREATE OR REPLACE FUNCTION refresh_dashboard_upcoming()
+RETURNS TRIGGER AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY public."dashboard_upcoming";
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trg_events_refresh_dashboard_upcoming ON "events";
+CREATE TRIGGER trg_events_refresh_dashboard_upcoming
+AFTER INSERT OR UPDATE OR DELETE ON "events"
+FOR EACH STATEMENT
+EXECUTE FUNCTION refresh_dashboard_upcoming();
+
+DROP TRIGGER IF EXISTS trg_holidays_refresh_dashboard_upcoming ON "holidays";
+CREATE TRIGGER trg_holidays_refresh_dashboard_upcoming
+AFTER INSERT OR UPDATE OR DELETE ON "holidays"
+FOR EACH STATEMENT
+EXECUTE FUNCTION refresh_dashboard_upcoming();
+
+GRANT SELECT ON "dashboard_upcoming" TO anon, authenticated;
+
+-- NOTE: the `CURRENT_DATE - 1` cut-off is evaluated at refresh time, so the view
+-- is a superset of "today onwards"; the app still filters with `date=gte.<today>`.
+-- Optional nightly refresh to drop past rows (requires pg_cron):
+-- SELECT cron.schedule('refresh-dashboard-upcoming', '5 0 * * *', 'REFRESH MATERIALIZED VIEW CONCURRENTLY dashboard_upcoming');
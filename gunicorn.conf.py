@@ -0,0 +1,14 @@
+# stellarminprod/gunicorn.conf.py
+# Picked up automatically by `gunicorn wsgi:app`. Values come from config.py (env overridable).
+# gevent workers turn each blocking Supabase call into a greenlet yield, so one process
+# serves many concurrent requests. See config.py "Production Server" for the sizing rule.
+from config import PORT, GUNICORN_WORKERS, GUNICORN_WORKER_CONNECTIONS, GUNICORN_TIMEOUT
+
+bind = f"0.0.0.0:{PORT}"
+worker_class = "gevent"
+workers = GUNICORN_WORKERS
+worker_connections = GUNICORN_WORKER_CONNECTIONS
+timeout = GUNICORN_TIMEOUT
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,38 @@
+-- Login: one RPC for every account lookup
+-- fetch_and_verify_user used to query every batch table (b1-b4), teachers and
+-- admin separately. login_lookup(u) searches all of them server-side and
+-- returns each matching row as JSON, tagged with the table it came from in
+-- "batch_table". Teacher rows also carry "warden_hostel" (NULL unless the
+-- teacher is a hostel warden), so login needs no separate wardens query.
+-- Called as POST /rest/v1/rpc/login_lookup {"u": "<lowercased username>"}.
+-- Re-run this file after updating it (CREATE OR REPLACE keeps the signature).
+
+CREATE OR REPLACE FUNCTION login_lookup(u TEXT)
+RETURNS SETOF JSONB AS $$
+    SELECT to_jsonb(t) || jsonb_build_object('batch_table', 'b1') FROM "b1" t
+    WHERE t."roll_no" = u OR t."student_email" = u OR t."parent_email" = u
+    UNION ALL
+    SELECT to_jsonb(t) || jsonb_build_object('batch_table', 'b2') FROM "b2" t
+    WHERE t."roll_no" = u OR t."student_email" = u OR t."parent_email" = u
+    UNION ALL
+    SELECT to_jsonb(t) || jsonb_build_object('batch_table', 'b3') FROM "b3" t
+    WHERE t."roll_no" = u OR t."student_email" = u OR t."parent_email" = u
+    UNION ALL
+    SELECT to_jsonb(t) || jsonb_build_object('batch_table', 'b4') FROM "b4" t
+    WHERE t."roll_no" = u OR t."student_email" = u OR t."parent_email" = u
+    UNION ALL
+    -- LIMIT 2: login only needs to tell "exactly one" from "more than one"
+    (SELECT to_jsonb(t) || jsonb_build_object(
+        'batch_table', 'teachers',
+        'warden_hostel', (SELECT w."hostel_name" FROM "wardens" w WHERE w."teacher_email" = t."teacher_email" LIMIT 1)
+    ) FROM "teachers" t
+    WHERE t."username" = u
+    LIMIT 2)
+    UNION ALL
+    (SELECT to_jsonb(a) || jsonb_build_object('batch_table', 'admin') FROM "admin" a
+    WHERE a."username" = u
+    LIMIT 2);
+$$ LANGUAGE sql STABLE;
+-- SECURITY INVOKER (the default): the caller's RLS policies on these tables still apply.
+
+GRANT EXECUTE ON FUNCTION login_lookup(TEXT) TO anon, authenticated;
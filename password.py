@@ -1,9 +1,25 @@
 # hash_password.py
-from werkzeug.security import generate_password_hash
+# Interactive:  python password.py
+# Bulk seeding: python password.py --batch users.csv hashed.csv   ("-" for stdin/stdout)
+#   Input rows are "username,password"; output rows are "username,hash".
+from argon2 import PasswordHasher
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
 import getpass # Use getpass to hide password input
+import sys
+
+from config import ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM
+
+# Same argon2id parameters as app.py, so hashes made here are not re-hashed on first login
+PH = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM
+)
 
 def create_hash():
-    """Generates a password hash using Werkzeug."""
+    """Generates an argon2id password hash."""
     try:
         # Prompt for password securely (hides input)
         password = getpass.getpass("Enter the password to hash: ")
@@ -17,9 +33,8 @@ def create_hash():
             print("\nError: Passwords do not match.")
             return
 
-        # Generate the hash using the recommended method
-        # pbkdf2:sha256 is the default and is secure
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        # Generate the hash with the app's tuned argon2id cost (see ARGON2_* in config.py)
+        hashed_password = PH.hash(password)
 
         print("\n--- Password Hash ---")
         print("Copy the entire line below and paste it into your Supabase password column:")
@@ -29,5 +44,33 @@ def create_hash():
     except Exception as e:
         print(f"\nAn error occurred: {e}")
 
+def _hash_row(row):
+    """(username, password) -> (username, hash). Module-level so worker processes can unpickle it."""
+    username, password = row[0], row[1]
+    return username, PH.hash(password)
+
+def batch(inpath, outpath, workers=None):
+    """Hashes every CSV row in parallel across CPU cores (argon2id is CPU/memory bound)."""
+    infile = sys.stdin if inpath == "-" else open(inpath, newline="", encoding="utf-8")
+    with infile:
+        rows = [row for row in csv.reader(infile) if len(row) >= 2 and row[1]]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        hashed = list(executor.map(_hash_row, rows, chunksize=16))
+
+    outfile = sys.stdout if outpath == "-" else open(outpath, "w", newline="", encoding="utf-8")
+    with outfile:
+        csv.writer(outfile).writerows(hashed)
+    print(f"Hashed {len(hashed)} passwords.", file=sys.stderr)
+
 if __name__ == "__main__":
-    create_hash()
+    parser = argparse.ArgumentParser(description="Generate argon2id password hashes.")
+    parser.add_argument("--batch", nargs=2, metavar=("IN_CSV", "OUT_CSV"),
+                        help='hash "username,password" rows from IN_CSV into "username,hash" rows in OUT_CSV')
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --batch (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.batch:
+        batch(*args.batch, workers=args.workers)
+    else:
+        create_hash()
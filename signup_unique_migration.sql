@@ -0,0 +1,21 @@
+-- Migration: enforce signup uniqueness in the database
+-- signup_page() no longer pre-checks roll_no / student_email / parent_email with
+-- separate SELECTs; it inserts directly and maps the 409 unique violation back
+-- to the offending field. new_sql.txt already declares these columns UNIQUE;
+-- run this only for b1..b4 tables created without those constraints.
+
+CREATE UNIQUE INDEX IF NOT EXISTS b1_roll_no_key ON "b1"("roll_no");
+CREATE UNIQUE INDEX IF NOT EXISTS b1_student_email_key ON "b1"("student_email");
+CREATE UNIQUE INDEX IF NOT EXISTS b1_parent_email_key ON "b1"("parent_email");
+
+CREATE UNIQUE INDEX IF NOT EXISTS b2_roll_no_key ON "b2"("roll_no");
+CREATE UNIQUE INDEX IF NOT EXISTS b2_student_email_key ON "b2"("student_email");
+CREATE UNIQUE INDEX IF NOT EXISTS b2_parent_email_key ON "b2"("parent_email");
+
+CREATE UNIQUE INDEX IF NOT EXISTS b3_roll_no_key ON "b3"("roll_no");
+CREATE UNIQUE INDEX IF NOT EXISTS b3_student_email_key ON "b3"("student_email");
+CREATE UNIQUE INDEX IF NOT EXISTS b3_parent_email_key ON "b3"("parent_email");
+
+CREATE UNIQUE INDEX IF NOT EXISTS b4_roll_no_key ON "b4"("roll_no");
+CREATE UNIQUE INDEX IF NOT EXISTS b4_student_email_key ON "b4"("student_email");
+CREATE UNIQUE INDEX IF NOT EXISTS b4_parent_email_key ON "b4"("parent_email");
@@ -0,0 +1,19 @@
+-- Trigram indexes for the warden student search
+-- /api/warden/search-student filters every batch table with
+-- roll_no ILIKE '%q%' OR student_name ILIKE '%q%'. A leading wildcard can't use a
+-- B-tree index, so without these each keystroke is a sequential scan of b1..b4.
+-- pg_trgm GIN indexes serve ILIKE '%..%' (and the OR becomes a BitmapOr of both).
+-- The admin course/teacher searches are equality filters (see admin_search.sql)
+-- and don't need trigram indexes.
+-- Check with: EXPLAIN ANALYZE SELECT * FROM b1 WHERE student_name ILIKE '%kumar%';
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_b1_roll_no_trgm ON "b1" USING gin ("roll_no" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_b1_student_name_trgm ON "b1" USING gin ("student_name" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_b2_roll_no_trgm ON "b2" USING gin ("roll_no" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_b2_student_name_trgm ON "b2" USING gin ("student_name" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_b3_roll_no_trgm ON "b3" USING gin ("roll_no" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_b3_student_name_trgm ON "b3" USING gin ("student_name" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_b4_roll_no_trgm ON "b4" USING gin ("roll_no" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_b4_student_name_trgm ON "b4" USING gin ("student_name" gin_trgm_ops);
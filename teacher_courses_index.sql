@@ -0,0 +1,12 @@
+-- Covering index for a teacher's assigned courses
+-- The teacher marks, attendance and student-profile pages (and /api/teacher/courses)
+-- run: SELECT course_code, course_name, semester, credits FROM courses
+--      WHERE assisting_teacher = $1 ORDER BY semester, course_name
+-- Equality on the leading column plus the ORDER BY columns, with the remaining
+-- projected columns INCLUDEd, makes this an index-only scan with no sort step.
+-- The leading column also serves the admin course search's teacher filter (admin_search.sql).
+-- Check with: EXPLAIN (ANALYZE, BUFFERS) on the query above.
+
+CREATE INDEX IF NOT EXISTS idx_courses_teacher_sem_name
+    ON "courses" ("assisting_teacher", "semester", "course_name")
+    INCLUDE ("course_code", "credits");
@@ -0,0 +1,29 @@
+-- Admin timetable page: entries pre-grouped by day
+-- manage_timetable_page used to fetch a flat, embedded list and group it by
+-- day_of_week in Python. timetable_grouped(p_semester) returns the grouped
+-- object directly: {"MON": [{id, start_time, end_time, subject_code, venue,
+-- course_name}, ...], ...}, each day ordered by start_time ({} when empty).
+-- Called as POST /rest/v1/rpc/timetable_grouped {"p_semester": <int>}.
+
+CREATE OR REPLACE FUNCTION timetable_grouped(p_semester INTEGER)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(s.day_of_week, s.entries), '{}'::jsonb)
+    FROM (
+        SELECT t."day_of_week",
+               jsonb_agg(jsonb_build_object(
+                   'id', t."id",
+                   'start_time', t."start_time",
+                   'end_time', t."end_time",
+                   'subject_code', t."subject_code",
+                   'venue', t."venue",
+                   'course_name', c."course_name"
+               ) ORDER BY t."start_time") AS entries
+        FROM "timetables" t
+        LEFT JOIN "courses" c ON c."course_code" = t."subject_code"
+        WHERE t."semester" = p_semester
+        GROUP BY t."day_of_week"
+    ) s;
+$$ LANGUAGE sql STABLE;
+-- SECURITY INVOKER (the default): existing RLS on timetables/courses still applies.
+
+GRANT EXECUTE ON FUNCTION timetable_grouped(INTEGER) TO anon, authenticated;
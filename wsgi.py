@@ -0,0 +1,17 @@
+# stellarminprod/wsgi.py
+# Production entrypoint: gevent WSGI server.
+# monkey.patch_all() must run before anything imports socket/ssl (requests, urllib3),
+# so every outbound Supabase call yields to other greenlets instead of blocking the process.
+from gevent import monkey
+monkey.patch_all()
+
+import logging
+
+from gevent.pywsgi import WSGIServer
+
+from app import app
+from config import PORT
+
+if __name__ == "__main__":
+    logging.getLogger(__name__).info("Serving on 0.0.0.0:%s (gevent)", PORT)
+    WSGIServer(('0.0.0.0', PORT), app).serve_forever()